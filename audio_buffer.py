@@ -0,0 +1,64 @@
+import threading
+
+class AudioRingBuffer:
+    """Fixed-capacity byte ring shared between the PortAudio thread and the event loop.
+
+    Writes copy into preallocated storage and never grow it; when the ring is
+    full the incoming frame is dropped and counted. Reads return a memoryview
+    that stays valid until the next read: a contiguous region is handed out
+    without copying, a wrapped one is stitched into a second preallocated buffer.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = memoryview(bytearray(capacity))
+        self.out = memoryview(bytearray(capacity))
+        self.lock = threading.Lock()
+        self.start = 0
+        self.size = 0  # bytes in the ring, including the region held by the last read
+        self.held = 0
+        self.overflows = 0
+        self.dropped_bytes = 0
+
+    @property
+    def available(self):
+        return self.size - self.held
+
+    def write(self, data):
+        n = len(data)
+        with self.lock:
+            if n > self.capacity - self.size:
+                self.overflows += 1
+                self.dropped_bytes += n
+                return False
+            end = (self.start + self.size) % self.capacity
+            first = min(n, self.capacity - end)
+            self.buf[end:end + first] = data[:first]
+            self.buf[:n - first] = data[first:]
+            self.size += n
+            return True
+
+    def read(self, n=None):
+        with self.lock:
+            self._release()
+            n = self.size if n is None else min(n, self.size)
+            first = min(n, self.capacity - self.start)
+            if first == n:
+                view = self.buf[self.start:self.start + n]
+            else:
+                self.out[:first] = self.buf[self.start:]
+                self.out[first:n] = self.buf[:n - first]
+                view = self.out[:n]
+            self.held = n
+            return view
+
+    def clear(self):
+        with self.lock:
+            self.start = 0
+            self.size = 0
+            self.held = 0
+
+    def _release(self):
+        self.start = (self.start + self.held) % self.capacity
+        self.size -= self.held
+        self.held = 0
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+from audio_format import RATE
+from resampler import PolyphaseResampler
+
+# Wire format negotiated in session.update: pcm16 at RATE, or G.711 at 8 kHz
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "pcm16")
+G711_RATE = 8000
+
+# Segment end points from the reference G.711 implementation
+_ULAW_SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEG_END = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+
+def ulaw_encode(samples):
+    pcm = samples.astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = np.searchsorted(_ULAW_SEG_END, pcm)
+    uval = (np.minimum(seg, 7) << 4) | ((pcm >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return ((uval ^ mask) & 0xFF).astype(np.uint8)
+
+def alaw_encode(samples):
+    pcm = samples.astype(np.int32) >> 3
+    negative = pcm < 0
+    mask = np.where(negative, 0x55, 0xD5)
+    pcm = np.where(negative, -pcm - 1, pcm)
+    seg = np.searchsorted(_ALAW_SEG_END, pcm)
+    shift = np.where(seg < 2, 1, seg)
+    aval = (np.minimum(seg, 7) << 4) | ((pcm >> shift) & 0x0F)
+    aval = np.where(seg >= 8, 0x7F, aval)
+    return ((aval ^ mask) & 0xFF).astype(np.uint8)
+
+def _ulaw_decode_table():
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + _ULAW_BIAS) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+def _alaw_decode_table():
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    seg = (a & 0x70) >> 4
+    t = (a & 0x0F) << 4
+    t = np.where(seg == 0, t + 8, (t + 0x108) << np.maximum(seg - 1, 0))
+    return np.where(a & 0x80, t, -t).astype(np.int16)
+
+# Every possible code decodes through a 256-entry lookup
+ULAW_DECODE_TABLE = _ulaw_decode_table()
+ALAW_DECODE_TABLE = _alaw_decode_table()
+
+class AudioCodec:
+    """Converts between device PCM16 at RATE and the session's wire format."""
+
+    FORMATS = ("pcm16", "g711_ulaw", "g711_alaw")
+
+    def __init__(self, name=AUDIO_FORMAT):
+        if name not in self.FORMATS:
+            raise ValueError(f"Unsupported audio format '{name}', expected one of {self.FORMATS}")
+        self.name = name
+        self.wire_rate = RATE if name == "pcm16" else G711_RATE
+        # Separate streaming state for the upstream and downstream directions
+        self.encode_resampler = PolyphaseResampler(RATE, self.wire_rate)
+        self.decode_resampler = PolyphaseResampler(self.wire_rate, RATE)
+
+    @property
+    def wire_bytes_per_second(self):
+        return self.wire_rate * (2 if self.name == "pcm16" else 1)
+
+    def encode(self, pcm):
+        if self.name == "pcm16":
+            return pcm
+        samples = self.encode_resampler.process(np.frombuffer(pcm, dtype=np.int16))
+        if self.name == "g711_ulaw":
+            return ulaw_encode(samples).tobytes()
+        return alaw_encode(samples).tobytes()
+
+    def decode(self, data):
+        if self.name == "pcm16":
+            return data
+        codes = np.frombuffer(data, dtype=np.uint8)
+        table = ULAW_DECODE_TABLE if self.name == "g711_ulaw" else ALAW_DECODE_TABLE
+        return self.decode_resampler.process(table[codes]).tobytes()
@@ -0,0 +1,13 @@
+import os
+
+# Session audio format; devices are opened in their native format and converted to this
+CHUNK = 1024
+CHANNELS = 1
+RATE = 24000
+BYTES_PER_FRAME = CHANNELS * 2  # 16-bit samples
+
+# Number of captured CHUNKs the mic hands to the upload framer at a time
+MIC_FRAMES_PER_UPLOAD = int(os.getenv("MIC_FRAMES_PER_UPLOAD", "1"))
+
+# Keep the mic open while the assistant talks so the user can interrupt it
+FULL_DUPLEX = os.getenv("FULL_DUPLEX", "0") == "1"
@@ -0,0 +1,68 @@
+import os
+import time
+import logging
+from audio_format import RATE, BYTES_PER_FRAME
+
+# Target size of each input_audio_buffer.append; UPLOAD_CHUNK_BYTES (wire bytes) wins when set
+UPLOAD_CHUNK_MS = int(os.getenv("UPLOAD_CHUNK_MS", "40"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", "0"))
+UPLOAD_STATS_INTERVAL = 5  # seconds between throughput log lines
+
+# input_audio_buffer.append with the base64 payload spliced in; base64 never needs JSON escaping
+APPEND_PREFIX = '{"type":"input_audio_buffer.append","audio":"'
+APPEND_SUFFIX = '"}'
+
+class AudioFramer:
+    """Coalesces or splits captured PCM into fixed-size upload frames."""
+
+    def __init__(self, codec, chunk_ms=UPLOAD_CHUNK_MS, chunk_bytes=UPLOAD_CHUNK_BYTES):
+        if chunk_bytes:
+            # Convert the wire-size target back into session PCM bytes
+            chunk_ms = chunk_bytes * 1000 / codec.wire_bytes_per_second
+        self.frame_bytes = max(1, int(RATE * chunk_ms / 1000)) * BYTES_PER_FRAME
+        self.pending = bytearray()
+
+    def push(self, audio):
+        """Returns the complete frames now available; the remainder waits for more audio."""
+        self.pending += audio
+        usable = len(self.pending) - len(self.pending) % self.frame_bytes
+        frames = [bytes(self.pending[i:i + self.frame_bytes]) for i in range(0, usable, self.frame_bytes)]
+        del self.pending[:usable]
+        return frames
+
+    def flush(self):
+        frame = bytes(self.pending)
+        self.pending.clear()
+        return frame
+
+def append_message(base64_audio):
+    return APPEND_PREFIX + base64_audio + APPEND_SUFFIX
+
+class UploadStats:
+    """Frames and bytes per second of outgoing audio, logged every UPLOAD_STATS_INTERVAL."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.window_start = time.monotonic()
+        self.window_frames = 0
+        self.window_bytes = 0
+        self.frames_per_second = 0.0
+        self.bytes_per_second = 0.0
+
+    def record(self, message_bytes):
+        self.frames += 1
+        self.bytes += message_bytes
+        self.window_frames += 1
+        self.window_bytes += message_bytes
+        elapsed = time.monotonic() - self.window_start
+        if elapsed >= UPLOAD_STATS_INTERVAL:
+            self.frames_per_second = self.window_frames / elapsed
+            self.bytes_per_second = self.window_bytes / elapsed
+            logging.debug(
+                f"Audio upload: {self.frames_per_second:.1f} frames/s, "
+                f"{self.bytes_per_second / 1000:.1f} kB/s ({self.frames} frames total)"
+            )
+            self.window_start = time.monotonic()
+            self.window_frames = 0
+            self.window_bytes = 0
@@ -1,35 +1,100 @@
 import pyaudio
 import asyncio
-import queue
 import logging
+import os
+import threading
+import collections
+import numpy as np
+from audio_buffer import AudioRingBuffer
+from resampler import PolyphaseResampler, to_mono, from_mono
+from audio_format import CHUNK, RATE, BYTES_PER_FRAME, MIC_FRAMES_PER_UPLOAD, FULL_DUPLEX
 
-# Audio recording parameters
-CHUNK = 1024
 FORMAT = pyaudio.paInt16
-CHANNELS = 1
-RATE = 24000
+
+# Optional PyAudio device indices, the system defaults are used otherwise
+INPUT_DEVICE_INDEX = os.getenv("INPUT_DEVICE_INDEX") or None
+OUTPUT_DEVICE_INDEX = os.getenv("OUTPUT_DEVICE_INDEX") or None
+# Multi-channel interfaces are opened with at most this many channels and downmixed
+MAX_DEVICE_CHANNELS = 2
+
+# Capacity of the capture ring buffer; frames arriving when it is full are dropped
+MIC_BUFFER_SECONDS = 10
+
+# Streaming playback: how much audio to buffer before the output stream starts
+PLAYBACK_JITTER_MS = int(os.getenv("PLAYBACK_JITTER_MS", "80"))
+# Silence written after each reply so the device doesn't pop when it goes idle
+PLAYBACK_TAIL_MS = 50
+
+def negotiate_device(p, direction, device_index=None):
+    """Returns (index, native_rate, channels) for the input or output device."""
+    if device_index is not None:
+        info = p.get_device_info_by_index(int(device_index))
+    elif direction == "input":
+        info = p.get_default_input_device_info()
+    else:
+        info = p.get_default_output_device_info()
+    rate = int(info["defaultSampleRate"])
+    max_channels = int(info["maxInputChannels" if direction == "input" else "maxOutputChannels"])
+    channels = max(1, min(max_channels, MAX_DEVICE_CHANNELS))
+    logging.info(f"Using {direction} device '{info['name']}' at {rate} Hz, {channels} channel(s)")
+    return int(info["index"]), rate, channels
 
 class AsyncMicrophone:
-    def __init__(self):
-        self.p = pyaudio.PyAudio()
+    def __init__(self, frames_per_read=MIC_FRAMES_PER_UPLOAD, full_duplex=FULL_DUPLEX, audio=None):
+        # The PortAudio thread writes into a bounded ring and wakes the event loop
+        self.loop = asyncio.get_running_loop()
+        self.buffer = AudioRingBuffer(MIC_BUFFER_SECONDS * RATE * BYTES_PER_FRAME)
+        self.read_bytes = frames_per_read * CHUNK * BYTES_PER_FRAME
+        self.data_ready = asyncio.Event()
+        self.wakeup_pending = False
+        self.is_recording = False
+        self.is_receiving = False
+        self.full_duplex = full_duplex
+        # Any PyAudio-compatible host, e.g. the virtual devices in benchmarks/virtual_audio.py
+        self.p = audio or pyaudio.PyAudio()
+        device_index, self.device_rate, self.device_channels = negotiate_device(
+            self.p, "input", INPUT_DEVICE_INDEX
+        )
+        self.resampler = PolyphaseResampler(self.device_rate, RATE)
         self.stream = self.p.open(
             format=FORMAT,
-            channels=CHANNELS,
-            rate=RATE,
+            channels=self.device_channels,
+            rate=self.device_rate,
             input=True,
-            frames_per_buffer=CHUNK,
+            input_device_index=device_index,
+            frames_per_buffer=CHUNK * self.device_rate // RATE,
             stream_callback=self.callback,
         )
-        self.queue = queue.Queue()
-        self.is_recording = False
-        self.is_receiving = False
         logging.info("AsyncMicrophone initialized")
 
+    def _to_session_format(self, in_data):
+        if self.resampler.passthrough and self.device_channels == 1:
+            return in_data
+        samples = to_mono(np.frombuffer(in_data, dtype=np.int16), self.device_channels)
+        return self.resampler.process(samples).tobytes()
+
     def callback(self, in_data, frame_count, time_info, status):
-        if self.is_recording and not self.is_receiving:
-            self.queue.put(in_data)
+        if self.is_recording and (self.full_duplex or not self.is_receiving):
+            self.buffer.write(self._to_session_format(in_data))
+            if not self.wakeup_pending:
+                self.wakeup_pending = True
+                self.loop.call_soon_threadsafe(self._wake)
         return (None, pyaudio.paContinue)
 
+    def _wake(self):
+        self.wakeup_pending = False
+        self.data_ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Returns a memoryview into the ring that is valid until the next read
+        while self.buffer.available < self.read_bytes:
+            self.data_ready.clear()
+            await self.data_ready.wait()
+        return self.buffer.read(self.read_bytes)
+
     def start_recording(self):
         self.is_recording = True
         logging.info("Started recording")
@@ -40,7 +105,8 @@ class AsyncMicrophone:
 
     def start_receiving(self):
         self.is_receiving = True
-        self.is_recording = False
+        if not self.full_duplex:
+            self.is_recording = False
         logging.info("Started receiving assistant response")
 
     def stop_receiving(self):
@@ -48,32 +114,176 @@ class AsyncMicrophone:
         logging.info("Stopped receiving assistant response")
 
     def get_audio_data(self):
-        data = b""
-        while not self.queue.empty():
-            data += self.queue.get()
+        data = self.buffer.read()
         return data if data else None
 
     def close(self):
         self.stream.stop_stream()
         self.stream.close()
         self.p.terminate()
+        if self.buffer.overflows:
+            logging.warning(
+                f"Microphone buffer overflowed {self.buffer.overflows} times, "
+                f"dropped {self.buffer.dropped_bytes} bytes"
+            )
         logging.info("AsyncMicrophone closed")
 
-async def play_audio(audio_data):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True)
-    stream.write(audio_data)
+class AudioPlayer:
+    """Keeps one callback-driven output stream open for the whole session.
 
-    # Add a small delay (e.g., 100ms) of silence at the end to prevent popping, and weird cuts off sounds
-    silence_duration = 0.2  # 200ms
-    silence_frames = int(RATE * silence_duration)
-    silence = b"\x00" * (silence_frames * CHANNELS * 2)  # 2 bytes per sample for 16-bit audio
-    stream.write(silence)
+    The event loop only appends decoded chunks to a queue; PortAudio pulls them
+    from its own thread, so playback never blocks the WebSocket receive loop.
+    """
 
-    # Add a small pause before closing the stream to make sure the audio is fully played
-    await asyncio.sleep(0.5)
+    def __init__(self, jitter_ms=PLAYBACK_JITTER_MS, audio=None):
+        self.loop = asyncio.get_running_loop()
+        self.p = audio or pyaudio.PyAudio()
+        device_index, self.device_rate, self.device_channels = negotiate_device(
+            self.p, "output", OUTPUT_DEVICE_INDEX
+        )
+        self.resampler = PolyphaseResampler(RATE, self.device_rate)
+        # Everything below is counted in device bytes, after conversion from the session format
+        self.device_frame_bytes = self.device_channels * 2
+        self.device_bytes_per_ms = self.device_rate * self.device_frame_bytes / 1000
+        self.jitter_bytes = int(self.device_rate * jitter_ms / 1000) * self.device_frame_bytes
+        self.lock = threading.Lock()
+        self.chunks = collections.deque()
+        self.offset = 0  # bytes of chunks[0] already handed to the device
+        self.queued_bytes = 0
+        self.primed = False  # jitter buffer filled, the callback is draining the queue
+        self.ending = False  # the reply is complete, play out whatever is left
+        self.out = bytearray(CHUNK * self.device_frame_bytes)
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.bytes_played = 0
+        # Running totals that survive reset(), used to locate the playhead within an item
+        self.session_bytes_enqueued = 0
+        self.session_bytes_played = 0
+        self.underruns = 0
+        self.max_queued_ms = 0.0
+        self.stream = self.p.open(
+            format=FORMAT,
+            channels=self.device_channels,
+            rate=self.device_rate,
+            output=True,
+            output_device_index=device_index,
+            frames_per_buffer=CHUNK * self.device_rate // RATE,
+            stream_callback=self.callback,
+        )
+        logging.info("AudioPlayer initialized")
+
+    @property
+    def queued_ms(self):
+        return self.queued_bytes / self.device_bytes_per_ms
+
+    @property
+    def session_ms_enqueued(self):
+        return self.session_bytes_enqueued / self.device_bytes_per_ms
+
+    @property
+    def session_ms_played(self):
+        return self.session_bytes_played / self.device_bytes_per_ms
+
+    def _to_device_format(self, chunk):
+        if self.resampler.passthrough and self.device_channels == 1:
+            return bytes(chunk)
+        samples = self.resampler.process(np.frombuffer(chunk, dtype=np.int16))
+        return from_mono(samples, self.device_channels).tobytes()
+
+    def callback(self, in_data, frame_count, time_info, status):
+        wanted = frame_count * self.device_frame_bytes
+        if len(self.out) < wanted:
+            self.out = bytearray(wanted)
+        out = memoryview(self.out)[:wanted]
+        filled = 0
+        with self.lock:
+            if self.primed:
+                while filled < wanted and self.chunks:
+                    chunk = self.chunks[0]
+                    take = min(len(chunk) - self.offset, wanted - filled)
+                    out[filled:filled + take] = chunk[self.offset:self.offset + take]
+                    filled += take
+                    self.offset += take
+                    if self.offset == len(chunk):
+                        self.chunks.popleft()
+                        self.offset = 0
+                self.queued_bytes -= filled
+                self.bytes_played += filled
+                self.session_bytes_played += filled
+                if not self.chunks:
+                    if not self.ending:
+                        # Starved mid-reply: re-buffer up to the jitter threshold before resuming
+                        self.underruns += 1
+                    self.primed = False
+                    self.ending = False
+                    self.loop.call_soon_threadsafe(self._signal_drained)
+        out[filled:] = bytes(wanted - filled)
+        return (bytes(out), pyaudio.paContinue)
+
+    def _signal_drained(self):
+        if not self.queued_bytes:
+            self.drained.set()
+
+    def enqueue(self, chunk):
+        """Queue session-format audio for playback without blocking the event loop."""
+        chunk = self._to_device_format(chunk) if chunk else b""
+        if not chunk:
+            return
+        self.drained.clear()
+        with self.lock:
+            self.chunks.append(chunk)
+            self.queued_bytes += len(chunk)
+            self.session_bytes_enqueued += len(chunk)
+            if not self.primed and self.queued_bytes >= self.jitter_bytes:
+                self.primed = True
+        self.max_queued_ms = max(self.max_queued_ms, self.queued_ms)
 
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-    logging.debug("Audio playback completed")
+    def flush(self):
+        """Drop everything still queued, e.g. when the reply is cancelled."""
+        with self.lock:
+            dropped = self.queued_bytes
+            self.chunks.clear()
+            self.offset = 0
+            self.queued_bytes = 0
+            self.primed = False
+            self.ending = False
+        self.resampler.reset()
+        self.drained.set()
+        if dropped:
+            logging.debug(f"Flushed {dropped} bytes of queued audio")
+        return dropped
+
+    async def drain(self):
+        """Wait until the queue is empty and the device has played the last buffer."""
+        await self.drained.wait()
+        await asyncio.sleep(self.stream.get_output_latency())
+
+    async def finish(self):
+        """Play out the rest of the current reply and wait for it to be heard."""
+        with self.lock:
+            if self.queued_bytes or self.bytes_played:
+                # A short tail of silence prevents popping when the device goes idle
+                tail = bytes(int(self.device_rate * PLAYBACK_TAIL_MS / 1000) * self.device_frame_bytes)
+                self.chunks.append(tail)
+                self.queued_bytes += len(tail)
+                self.drained.clear()
+                self.ending = True
+                self.primed = True
+        await self.drain()
+        if self.bytes_played:
+            logging.info(
+                f"Played {self.bytes_played} bytes of audio "
+                f"(max queue {self.max_queued_ms:.0f}ms, {self.underruns} underruns this session)"
+            )
+        self.reset()
+
+    def reset(self):
+        self.flush()
+        self.bytes_played = 0
+        self.max_queued_ms = 0.0
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.p.terminate()
+        logging.info("AudioPlayer closed")
@@ -0,0 +1,63 @@
+import time
+import logging
+from utils import log_runtime
+
+class BargeInController:
+    """Cuts the assistant off as soon as the user talks over it (full-duplex mode).
+
+    Tracks which audio item is playing and where its playhead is, so an
+    interruption can cancel the response, truncate the item at what the user
+    actually heard and silence the output immediately.
+    """
+
+    def __init__(self, client, player):
+        self.client = client
+        self.player = player
+        self.response_active = False
+        self.item_id = None
+        self.item_start_ms = 0.0  # session playback offset at which the current audio item was enqueued
+        self.interrupted = False  # drop late deltas of a response we already cut off
+
+    @property
+    def assistant_speaking(self):
+        return self.response_active or self.player.queued_bytes > 0
+
+    def on_response_created(self):
+        self.response_active = True
+        self.interrupted = False
+
+    def on_response_done(self):
+        self.response_active = False
+
+    def on_audio_delta(self, item_id):
+        """Returns False if the delta belongs to a reply that was interrupted."""
+        if self.interrupted:
+            return False
+        if item_id != self.item_id:
+            self.item_id = item_id
+            self.item_start_ms = self.player.session_ms_enqueued
+        return True
+
+    async def interrupt(self, source, speech_onset=None):
+        if self.interrupted or not self.assistant_speaking:
+            return False
+        speech_onset = speech_onset or time.perf_counter()
+        audio_end_ms = int(max(0.0, self.player.session_ms_played - self.item_start_ms))
+        self.interrupted = True
+        self.player.flush()
+
+        if self.response_active:
+            await self.client.send_event({"type": "response.cancel"})
+        if self.item_id:
+            await self.client.send_event({
+                "type": "conversation.item.truncate",
+                "item_id": self.item_id,
+                "content_index": 0,
+                "audio_end_ms": audio_end_ms,
+            })
+
+        # Turn latency runs from the user's speech onset until the output is silent
+        await self.player.drain()
+        log_runtime("barge_in_latency", time.perf_counter() - speech_onset)
+        logging.info(f"🛑 Barge-in ({source}): reply cut at {audio_end_ms}ms")
+        return True
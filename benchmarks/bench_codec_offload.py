@@ -0,0 +1,62 @@
+"""Event loop lag with audio deltas decoded inline vs on the codec thread pool.
+
+Simulates --sessions conversations on one loop. Each receives an audio
+delta of --delta-ms every --interval-ms and decodes it the way
+OpenAIRealtimeClient does. The lag reported is what a LoopLagMonitor
+sampling every millisecond sees.
+
+    python benchmarks/bench_codec_offload.py [--sessions 20] [--delta-ms 2000]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from codec_executor import CodecExecutor, LoopLagMonitor
+from event_decoder import decode_event
+from audio_codec import AudioCodec
+
+async def session(executor, codec, message, deltas, interval):
+    for _ in range(deltas):
+        event = decode_event(message)
+        if "audio" not in event:
+            await executor.decode(codec, event["delta"])
+        await asyncio.sleep(interval)
+
+async def run(threshold, args, message):
+    executor = CodecExecutor(threshold=threshold)
+    monitor = LoopLagMonitor(interval_ms=1)
+    monitor.start()
+    codec = AudioCodec("pcm16")
+    start = time.perf_counter()
+    await asyncio.gather(*(session(executor, codec, message, args.deltas, args.interval_ms / 1000)
+                           for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+    executor.pool.shutdown()
+    return elapsed, monitor.metrics()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--delta-ms", type=int, default=2000, help="audio per delta; 2000ms is ~128kB of base64")
+    parser.add_argument("--deltas", type=int, default=20, help="deltas per session")
+    parser.add_argument("--interval-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    audio = base64.b64encode(os.urandom(24000 * 2 * args.delta_ms // 1000)).decode("ascii")
+    message = json.dumps({"type": "response.audio.delta", "response_id": "resp_1", "item_id": "item_1",
+                          "output_index": 0, "content_index": 0, "delta": audio})
+    print(f"{args.sessions} sessions, {len(audio) / 1000:.0f}kB base64 per delta")
+    # Deltas under CODEC_OFFLOAD_BYTES are decoded by decode_event itself, in both runs
+    for label, threshold in (("inline", float("inf")), ("offloaded", 0)):
+        elapsed, lag = asyncio.run(run(threshold, args, message))
+        print(f"{label:>10}: {elapsed:.2f}s wall, loop lag p99 {lag['loop_lag_p99_ms']:.2f}ms, "
+              f"max {lag['loop_lag_max_ms']:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Decode cost per incoming realtime event, full json.loads vs decode_event.
+
+Replays frames recorded with REALTIME_RECORD_FILE (one raw frame per line).
+Without a recording it synthesises a reply-shaped mix: mostly audio deltas
+of --delta-ms audio each, plus text deltas and lifecycle events.
+
+    python benchmarks/bench_event_decode.py [traffic.jsonl] [--repeat 20]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from event_decoder import decode_event, json_loads, JSON_BACKEND
+
+def synthetic_traffic(replies=20, deltas_per_reply=50, delta_ms=100):
+    audio = base64.b64encode(os.urandom(24000 * 2 * delta_ms // 1000)).decode("ascii")
+    frames = []
+    for reply in range(replies):
+        ids = {"response_id": f"resp_{reply}", "item_id": f"item_{reply}"}
+        frames.append(json.dumps({"type": "response.created", "event_id": "evt", "response": {"id": ids["response_id"]}}))
+        for _ in range(deltas_per_reply):
+            frames.append(json.dumps({"type": "response.audio.delta", "event_id": "evt", **ids,
+                                      "output_index": 0, "content_index": 0, "delta": audio}))
+            frames.append(json.dumps({"type": "response.text.delta", "event_id": "evt", **ids, "delta": "word "}))
+        frames.append(json.dumps({"type": "response.done", "event_id": "evt", "response": {"id": ids["response_id"]}}))
+    return frames
+
+def bench(decoder, frames, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            event = decoder(frame)
+            if event["type"] == "response.audio.delta" and "audio" not in event:
+                base64.b64decode(event["delta"])  # the old path decoded the payload separately
+    return (time.perf_counter() - start) / (repeat * len(frames)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", nargs="?")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.recording:
+        with open(args.recording) as f:
+            frames = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        frames = synthetic_traffic()
+    audio_share = sum(1 for frame in frames if '"response.audio.delta"' in frame) / len(frames)
+    print(f"{len(frames)} frames, {audio_share:.0%} audio deltas")
+
+    results = [("json.loads + b64decode", json.loads)]
+    if JSON_BACKEND != "json":
+        results.append((f"{JSON_BACKEND}.loads + b64decode", json_loads))
+    results.append(("decode_event", decode_event))
+    for name, decoder in results:
+        print(f"{name:>28}: {bench(decoder, frames, args.repeat):8.2f} µs/event")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Throughput of PolyphaseResampler in real-time factor.
+
+RTF is processing time divided by audio duration, so lower is better and
+1 / RTF is how many live streams one core could convert.
+
+    python benchmarks/bench_resampler.py [--seconds 30] [--chunk-ms 20]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from resampler import PolyphaseResampler
+
+RATE_PAIRS = [(48000, 24000), (44100, 24000), (24000, 48000), (24000, 8000), (8000, 24000)]
+
+def bench(src_rate, dst_rate, seconds, chunk_ms):
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(src_rate * seconds) * 3000).astype(np.int16)
+    chunk = src_rate * chunk_ms // 1000
+    resampler = PolyphaseResampler(src_rate, dst_rate)
+    start = time.perf_counter()
+    for offset in range(0, audio.size, chunk):
+        resampler.process(audio[offset:offset + chunk])
+    return (time.perf_counter() - start) / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--chunk-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'conversion':>16}  {'RTF':>9}  {'x realtime':>10}")
+    for src_rate, dst_rate in RATE_PAIRS:
+        rtf = bench(src_rate, dst_rate, args.seconds, args.chunk_ms)
+        print(f"{src_rate:>6} -> {dst_rate:<6}  {rtf:9.5f}  {1 / rtf:10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""How many concurrent conversations server.py sustains per core.
+
+Starts mock_realtime_server and server.py as subprocesses, with the server
+pinned to a single CPU. With --workers N, supervisor.py runs instead, with
+N workers pinned to one core each. It then ramps up simulated callers. Each caller
+streams an utterance and trailing silence in real time, waits for the reply
+and repeats. For each level it reports the server's CPU use, summed over
+all its processes, and the latency from the end of the utterance to the
+first byte of reply audio.
+
+    python benchmarks/bench_server_load.py [--levels 5 10 20 40] [--turns 3] [--workers 4]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SEND_MS = 40
+
+def synthetic_utterance(rate=24000):
+    t = np.arange(rate) / rate
+    voice = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    voice *= 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    return (6000 * voice).astype(np.int16).tobytes()
+
+def cpu_seconds(pid):
+    """CPU time of pid and all its descendants."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    total = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = f.read().split()
+    return total + sum(cpu_seconds(int(child)) for child in children)
+
+async def caller(url, utterance, turns, timeout):
+    chunk = 24000 * 2 * SEND_MS // 1000
+    silence = bytes(chunk)
+    latencies = []
+    async with websockets.connect(url, max_size=None) as websocket:
+        while json.loads(await websocket.recv())["type"] != "ready":
+            pass
+        for _ in range(turns):
+            first_audio = asyncio.get_running_loop().create_future()
+            reply_done = asyncio.Event()
+
+            async def listen():
+                async for message in websocket:
+                    if isinstance(message, bytes):
+                        if not first_audio.done():
+                            first_audio.set_result(time.perf_counter())
+                    elif json.loads(message)["type"] == "reply.done":
+                        reply_done.set()
+                        return
+
+            async def speak():
+                next_send = time.perf_counter()
+                for start in range(0, len(utterance), chunk):
+                    await websocket.send(utterance[start:start + chunk])
+                    next_send += SEND_MS / 1000
+                    await asyncio.sleep(max(0, next_send - time.perf_counter()))
+                speech_end = time.perf_counter()
+                while not reply_done.is_set():
+                    await websocket.send(silence)
+                    next_send += SEND_MS / 1000
+                    await asyncio.sleep(max(0, next_send - time.perf_counter()))
+                return speech_end
+
+            listener = asyncio.create_task(listen())
+            try:
+                speech_end = await asyncio.wait_for(speak(), timeout)
+                latencies.append(first_audio.result() - speech_end)
+            except asyncio.TimeoutError:
+                latencies.append(None)
+            finally:
+                listener.cancel()
+        await websocket.send(json.dumps({"type": "hangup"}))
+    return latencies
+
+async def run_level(url, sessions, utterance, args, server_pid):
+    cpu_before, wall_before = cpu_seconds(server_pid), time.perf_counter()
+    results = await asyncio.gather(
+        *(caller(url, utterance, args.turns, args.timeout) for _ in range(sessions)), return_exceptions=True
+    )
+    cpu = (cpu_seconds(server_pid) - cpu_before) / (time.perf_counter() - wall_before)
+    latencies = [lat for result in results if isinstance(result, list) for lat in result if lat is not None]
+    failed = sum(args.turns if not isinstance(result, list) else result.count(None) for result in results)
+    return cpu, latencies, failed
+
+def spawn(args, env):
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_for_port(url, deadline=15):
+    start = time.perf_counter()
+    while True:
+        try:
+            async with websockets.connect(url):
+                return
+        except (OSError, websockets.InvalidHandshake):
+            if time.perf_counter() - start > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--turns", type=int, default=3, help="turns per caller at each level")
+    parser.add_argument("--reply-ms", type=int, default=600)
+    parser.add_argument("--cpu", type=int, default=0, help="core the single-process server is pinned to")
+    parser.add_argument("--workers", type=int, default=0, help="run supervisor.py with this many workers")
+    parser.add_argument("--max-cpu", type=float, default=0.85, help="per-core CPU share counted as sustainable")
+    parser.add_argument("--timeout", type=float, default=20)
+    parser.add_argument("--json", help="write the results here")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as script:
+        json.dump([{"text": "Load test reply.", "audio_ms": args.reply_ms}], script)
+    env = dict(os.environ, OPENAI_API_KEY="benchmark", OPENAI_REALTIME_URL="ws://127.0.0.1:18765")
+    mock = spawn(["mock_realtime_server.py", "--port", "18765", "--script", script.name], env)
+    if args.workers:
+        server = spawn(["supervisor.py", "--port", "18766", "--workers", str(args.workers),
+                        "--max-sessions", str(max(args.levels))], env)
+    else:
+        server = spawn(["server.py", "--port", "18766", "--max-sessions", str(max(args.levels))], env)
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(server.pid, {args.cpu})
+    cores = args.workers or 1
+    url = "ws://127.0.0.1:18766"
+    results = []
+    try:
+        await wait_for_port("ws://127.0.0.1:18765")
+        await wait_for_port(url)
+        if args.workers:
+            await asyncio.sleep(2)  # until every worker has reported in
+        utterance = synthetic_utterance()
+        print(f"{'sessions':>8}  {'cpu':>5}  {'p50':>8}  {'p95':>8}  {'failed':>6}")
+        for sessions in args.levels:
+            cpu, latencies, failed = await run_level(url, sessions, utterance, args, server.pid)
+            p50, p95 = (np.percentile(latencies, [50, 95]) * 1000) if latencies else (float("nan"),) * 2
+            results.append({"sessions": sessions, "cpu": cpu, "p50_ms": p50, "p95_ms": p95, "failed": failed})
+            print(f"{sessions:>8}  {cpu:5.0%}  {p50:6.0f}ms  {p95:6.0f}ms  {failed:>6}")
+    finally:
+        server.terminate()
+        mock.terminate()
+        os.unlink(script.name)
+
+    sustained = [r["sessions"] for r in results if r["cpu"] / cores <= args.max_cpu and not r["failed"]]
+    print(f"Sustained on {cores} core(s): {max(sustained) if sustained else 0} sessions")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "levels": results}, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Time-to-ready of a cold OpenAIRealtimeClient vs RealtimeSessionPool.acquire().
+
+Runs against mock_realtime_server. --handshake-ms delays the upgrade
+(standing in for DNS, TCP and TLS) and --rtt-ms delays the session.updated
+reply.
+
+    python benchmarks/bench_session_pool.py [--sessions 50] [--pool-size 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+from session_pool import RealtimeSessionPool
+from openai_client import OpenAIRealtimeClient
+from mock_realtime_server import MockRealtimeServer
+
+async def cold_session(url):
+    client = OpenAIRealtimeClient("benchmark", [], url=url)
+    await client.connect()
+    while (await client.receive_event())["type"] != "session.updated":
+        pass
+    return client
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:>6}: p50 {statistics.median(samples) * 1000:7.1f}ms  p95 {p95 * 1000:7.1f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=60)
+    parser.add_argument("--rtt-ms", type=float, default=40)
+    parser.add_argument("--think-ms", type=float, default=100, help="gap between sessions")
+    args = parser.parse_args()
+
+    server = await MockRealtimeServer(handshake_delay_ms=args.handshake_ms, session_delay_ms=args.rtt_ms).start()
+
+    cold = []
+    for _ in range(args.sessions):
+        start = time.perf_counter()
+        client = await cold_session(server.url)
+        cold.append(time.perf_counter() - start)
+        await client.close()
+        await asyncio.sleep(args.think_ms / 1000)
+
+    pool = RealtimeSessionPool("benchmark", [], size=args.pool_size, url=server.url)
+    await pool.start()
+    pooled = []
+    for _ in range(args.sessions):
+        start = time.perf_counter()
+        client = await pool.acquire()
+        pooled.append(time.perf_counter() - start)
+        await client.close()
+        await asyncio.sleep(args.think_ms / 1000)
+    metrics = pool.metrics()
+    await pool.close()
+    await server.close()
+
+    summarize("cold", cold)
+    summarize("pooled", pooled)
+    print(f"pool hits {metrics['hits']}, misses {metrics['misses']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
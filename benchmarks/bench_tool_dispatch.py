@@ -0,0 +1,62 @@
+"""Per-call overhead of dispatching a function call to its tool.
+
+Compares the old directory-scanning execute_tool with the ToolRegistry
+lookup and with calling the tool instance directly. The call is
+update_file on a missing file, so nothing is written. The registry is
+timed with the tool inline and in its usual thread execution_mode, which
+adds the hop to the tool thread pool.
+
+    python benchmarks/bench_tool_dispatch.py [--calls 2000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import importlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import tools
+from tools import BaseTool, execute_tool, get_registry
+
+async def scanning_execute_tool(tool_name, **kwargs):
+    """execute_tool as it was: rescan, re-import and instantiate everything on every call."""
+    tools_dir = os.path.dirname(tools.__file__)
+    for filename in os.listdir(tools_dir):
+        if filename.endswith('.py') and filename != '__init__.py' and filename != 'base_tool.py':
+            module = importlib.import_module(f'.{filename[:-3]}', package='tools')
+            for attr_name in dir(module):
+                attr = getattr(module, attr_name)
+                if isinstance(attr, type) and issubclass(attr, BaseTool) and attr != BaseTool:
+                    tool_instance = attr()
+                    if tool_instance.name == tool_name:
+                        return await tool_instance.execute(**kwargs)
+    raise ValueError(f"Tool '{tool_name}' not found")
+
+async def time_calls(dispatch, calls):
+    args = {"file_name": "bench-missing.txt"}
+    start = time.perf_counter()
+    for _ in range(calls):
+        await dispatch("update_file", **args)
+    return (time.perf_counter() - start) / calls
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    tool = get_registry().get("update_file")
+    results = [("scan per call", await time_calls(scanning_execute_tool, args.calls))]
+    for mode in ("async", "thread"):
+        tool.execution_mode = mode
+        results.append((f"registry {mode}", await time_calls(execute_tool, args.calls)))
+    results += [
+        ("direct", await time_calls(lambda name, **kwargs: tool.execute(**kwargs), args.calls)),
+    ]
+    get_registry().shutdown()
+    direct = results[-1][1]
+    for name, per_call in results:
+        print(f"{name:>15}: {per_call * 1e6:8.1f}µs/call, {(per_call - direct) * 1e6:8.1f}µs dispatch overhead")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+"""End-to-end turn latency: WAV in, through the real pipeline, to the first sound out.
+
+Replays WAV fixtures through AsyncMicrophone -> send_audio ->
+process_ws_messages -> AudioPlayer. It uses the virtual devices from
+virtual_audio.py and runs against mock_realtime_server. Every other turn
+makes a tool call (update_file on a missing file, so nothing is written).
+
+Reported per turn:
+  speech_end_to_commit        last speech sample captured -> input_audio_buffer.committed
+  commit_to_first_delta       committed -> first response.audio.delta (turns without a tool call)
+  first_delta_to_first_sound  first audio delta -> first non-silent output buffer
+  tool_round_trip             function_call_arguments.done -> follow-up response.created
+
+    python benchmarks/bench_turn_latency.py [--wav a.wav b.wav] [--turns 10] [--json out.json]
+
+Without --wav a synthetic one-second utterance is used.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import asyncio
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("PERSONALIZATION_FILE", os.path.join(os.path.dirname(__file__), "..", "personalization.json"))
+from virtual_audio import VirtualAudio
+from mock_realtime_server import MockRealtimeServer
+from openai_client import OpenAIRealtimeClient
+from audio_handler import AsyncMicrophone, AudioPlayer
+from barge_in import BargeInController
+from event_router import EventRouter
+from resampler import to_mono
+from vad import EnergyVAD, VAD_FRAME_MS
+from workflow import SESSION_INSTRUCTIONS, process_ws_messages, stream_microphone
+from agent_tools import tools
+
+METRICS = ["speech_end_to_commit", "commit_to_first_delta", "first_delta_to_first_sound", "tool_round_trip"]
+
+def load_wav(path):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        return f.readframes(f.getnframes()), f.getframerate(), f.getnchannels()
+
+def synthetic_utterance(rate=24000):
+    # 200ms of silence, then one second of a voiced, syllable-modulated 180 Hz buzz
+    t = np.arange(rate) / rate
+    voice = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    voice *= 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    pcm = np.concatenate([np.zeros(rate // 5), 6000 * voice])
+    return pcm.astype(np.int16).tobytes(), rate, 1
+
+def speech_end_offset(pcm, rate, channels):
+    """Byte offset just past the last frame EnergyVAD calls speech."""
+    samples = to_mono(np.frombuffer(pcm, dtype=np.int16), channels)
+    frame = rate * VAD_FRAME_MS // 1000
+    vad = EnergyVAD()
+    end = 0
+    for start in range(0, len(samples) - frame + 1, frame):
+        if vad.is_speech(samples[start:start + frame].tobytes()):
+            end = start + frame
+    if not end:
+        raise ValueError("No speech found in the fixture")
+    return end * channels * 2
+
+class TurnRecorder:
+    """Router middleware that timestamps the events marking each stage of a turn."""
+
+    def __init__(self):
+        self.times = {}
+        self.tool_turn = False
+        self.response_is_tool = False
+        self.turn_done = asyncio.Event()
+
+    def start_turn(self):
+        self.times = {}
+        self.tool_turn = False
+        self.turn_done.clear()
+
+    async def observe(self, event):
+        now = time.perf_counter()
+        event_type = event["type"]
+        if event_type == "input_audio_buffer.committed":
+            self.times.setdefault("committed", now)
+        elif event_type == "response.created":
+            self.response_is_tool = False
+            if "args_done" in self.times:
+                self.times.setdefault("tool_response_created", now)
+        elif event_type == "response.output_item.added" and event.get("item", {}).get("type") == "function_call":
+            self.response_is_tool = self.tool_turn = True
+        elif event_type == "response.function_call_arguments.done":
+            self.times["args_done"] = now
+        elif event_type == "response.audio.delta":
+            self.times.setdefault("first_delta", now)
+        elif event_type == "response.done" and not self.response_is_tool:
+            self.turn_done.set()
+        return event
+
+    def results(self, speech_end, onsets):
+        times = self.times
+        result = {"speech_end_to_commit": times["committed"] - speech_end}
+        if self.tool_turn:
+            result["tool_round_trip"] = times["tool_response_created"] - times["args_done"]
+        else:
+            result["commit_to_first_delta"] = times["first_delta"] - times["committed"]
+        first_sound = next((onset for onset in onsets if onset >= times["first_delta"]), None)
+        if first_sound is not None:
+            result["first_delta_to_first_sound"] = first_sound - times["first_delta"]
+        return result
+
+def summarize(samples):
+    samples = np.array(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+    }
+
+async def run(args):
+    fixtures = [load_wav(path) for path in args.wav] if args.wav else [synthetic_utterance()]
+    rate, channels = fixtures[0][1:]
+    if any(fixture[1:] != (rate, channels) for fixture in fixtures):
+        raise ValueError("All WAV fixtures must share one sample rate and channel count")
+    fixtures = [(pcm, speech_end_offset(pcm, rate, channels)) for pcm, _, _ in fixtures]
+
+    reply = {"text": "Scripted reply.", "audio_ms": args.reply_ms}
+    tool_call = {"function_call": {"name": "update_file", "arguments": {"file_name": "bench-missing.txt"}}}
+    server = await MockRealtimeServer(
+        script=[reply, tool_call, reply],
+        first_delta_delay_ms=args.server_delay_ms,
+        delta_interval_ms=args.delta_interval_ms,
+    ).start()
+
+    audio = VirtualAudio(input_rate=rate, input_channels=channels)
+    client = OpenAIRealtimeClient(SESSION_INSTRUCTIONS, tools, url=server.url)
+    mic = AsyncMicrophone(full_duplex=False, audio=audio)
+    player = AudioPlayer(audio=audio)
+    barge_in = BargeInController(client, player)
+    recorder = TurnRecorder()
+    router = EventRouter()
+    router.use(recorder.observe)
+
+    await client.connect()
+    tasks = [
+        asyncio.create_task(process_ws_messages(client, mic, player, barge_in, router)),
+        asyncio.create_task(stream_microphone(client, mic, None, barge_in)),
+    ]
+    mic.start_recording()
+    samples = {name: [] for name in METRICS}
+    try:
+        for turn in range(args.turns):
+            pcm, speech_end = fixtures[turn % len(fixtures)]
+            recorder.start_turn()
+            audio.input_stream.feed(pcm, marks={"speech_end": speech_end})
+            await asyncio.wait_for(recorder.turn_done.wait(), args.timeout)
+            while not mic.is_recording:  # the reply has finished playing
+                await asyncio.sleep(0.005)
+            result = recorder.results(audio.input_stream.mark_times.pop("speech_end"), audio.output_stream.onsets)
+            for name, value in result.items():
+                samples[name].append(value)
+            print(f"turn {turn + 1}: " + ", ".join(f"{name} {value * 1000:.1f}ms" for name, value in result.items()))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        mic.close()
+        player.close()
+        await client.close()
+        await server.close()
+
+    report = {
+        "config": vars(args),
+        "metrics": {name: summarize(values) for name, values in samples.items() if values},
+    }
+    print(f"{'metric':>28}  {'n':>3}  {'p50':>8}  {'p95':>8}  {'p99':>8}")
+    for name, stats in report["metrics"].items():
+        print(f"{name:>28}  {stats['n']:>3}  {stats['p50_ms']:6.1f}ms  {stats['p95_ms']:6.1f}ms  {stats['p99_ms']:6.1f}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wav", nargs="+", help="16-bit PCM fixtures, replayed in turn")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reply-ms", type=int, default=600, help="length of each scripted reply")
+    parser.add_argument("--server-delay-ms", type=float, default=150, help="mock server time to first delta")
+    parser.add_argument("--delta-interval-ms", type=float, default=20)
+    parser.add_argument("--timeout", type=float, default=15, help="seconds to wait for a turn")
+    parser.add_argument("--json", help="write the summary here, to diff runs between commits")
+    asyncio.run(run(parser.parse_args()))
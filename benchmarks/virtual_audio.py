@@ -0,0 +1,123 @@
+"""PyAudio stand-in for benchmarks: paced virtual input and output devices.
+
+Pass a VirtualAudio as audio= to AsyncMicrophone and AudioPlayer. Each
+stream runs its callback from its own thread at the device's real-time
+rate, like PortAudio does. The input plays whatever PCM was fed to it, then
+silence. The output timestamps every silence-to-sound transition. Device
+output latency is not modelled.
+"""
+import time
+import threading
+import collections
+import numpy as np
+import pyaudio
+
+class VirtualStream:
+    def __init__(self, rate, channels, frames_per_buffer, callback, is_input):
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = callback
+        self.is_input = is_input
+        self.lock = threading.Lock()
+        self.pending = collections.deque()
+        self.fed_bytes = 0
+        self.played_bytes = 0
+        self.marks = []  # (byte position, name) still to be reached by the input
+        self.mark_times = {}
+        self.onsets = []  # output: perf_counter() of each silence-to-sound transition
+        self.sounding = False
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def feed(self, pcm, marks=None):
+        """Queue int16 PCM for the input; marks maps a name to a byte offset within pcm.
+
+        mark_times[name] is set when the buffer holding that offset reaches the callback.
+        """
+        with self.lock:
+            for name, offset in (marks or {}).items():
+                self.marks.append((self.fed_bytes + offset, name))
+            self.pending.append(bytes(pcm))
+            self.fed_bytes += len(pcm)
+
+    def _take(self, size):
+        out = bytearray()
+        with self.lock:
+            while self.pending and len(out) < size:
+                chunk = self.pending.popleft()
+                take = size - len(out)
+                out += chunk[:take]
+                if len(chunk) > take:
+                    self.pending.appendleft(chunk[take:])
+            self.played_bytes += len(out)
+            reached = [mark for mark in self.marks if mark[0] <= self.played_bytes]
+            for mark in reached:
+                self.marks.remove(mark)
+        out += bytes(size - len(out))
+        return bytes(out), [name for _, name in reached]
+
+    def _run(self):
+        period = self.frames_per_buffer / self.rate
+        size = self.frames_per_buffer * self.channels * 2
+        deadline = time.perf_counter()
+        while self.running:
+            deadline += period
+            if self.is_input:
+                data, reached = self._take(size)
+                now = time.perf_counter()
+                for name in reached:
+                    self.mark_times[name] = now
+                self.callback(data, self.frames_per_buffer, None, 0)
+            else:
+                data, _ = self.callback(None, self.frames_per_buffer, None, 0)
+                sounding = bool(np.frombuffer(data, dtype=np.int16).any())
+                if sounding and not self.sounding:
+                    self.onsets.append(time.perf_counter())
+                self.sounding = sounding
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def get_output_latency(self):
+        return 0.0
+
+    def stop_stream(self):
+        self.running = False
+        self.thread.join()
+
+    def close(self):
+        self.running = False
+
+class VirtualAudio:
+    def __init__(self, input_rate=24000, input_channels=1, output_rate=24000, output_channels=1):
+        self.devices = [
+            {"index": 0, "name": "virtual input", "defaultSampleRate": input_rate,
+             "maxInputChannels": input_channels, "maxOutputChannels": 0},
+            {"index": 1, "name": "virtual output", "defaultSampleRate": output_rate,
+             "maxInputChannels": 0, "maxOutputChannels": output_channels},
+        ]
+        self.input_stream = None
+        self.output_stream = None
+
+    def get_default_input_device_info(self):
+        return self.devices[0]
+
+    def get_default_output_device_info(self):
+        return self.devices[1]
+
+    def get_device_info_by_index(self, index):
+        return self.devices[index]
+
+    def open(self, format=pyaudio.paInt16, channels=1, rate=24000, input=False, output=False,
+             frames_per_buffer=1024, stream_callback=None, **kwargs):
+        stream = VirtualStream(rate, channels, frames_per_buffer, stream_callback, is_input=input)
+        if input:
+            self.input_stream = stream
+        else:
+            self.output_stream = stream
+        return stream
+
+    def terminate(self):
+        pass
@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import binascii
+import threading
+import collections
+import concurrent.futures
+import numpy as np
+
+# Audio payloads (base64 characters or PCM bytes) at least this large are converted on a worker thread
+CODEC_OFFLOAD_BYTES = int(os.getenv("CODEC_OFFLOAD_BYTES", "65536"))
+CODEC_THREADS = int(os.getenv("CODEC_THREADS", "2"))
+# How often each session samples event loop lag; 0 disables the monitor
+LOOP_LAG_INTERVAL_MS = int(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_SAMPLES = 600
+
+_B64_ALPHABET = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/", dtype=np.uint8)
+_B64_VALUES = np.full(256, 255, dtype=np.uint8)
+_B64_VALUES[_B64_ALPHABET] = np.arange(64, dtype=np.uint8)
+_PAD = ord("=")
+
+class _Scratch(threading.local):
+    """Per-thread output buffers, grown to the largest payload seen and then reused."""
+
+    def __init__(self):
+        self.encoded = np.empty(0, dtype=np.uint8)
+        self.decoded = np.empty(0, dtype=np.uint8)
+
+    def get(self, name, size):
+        buf = getattr(self, name)
+        if len(buf) < size:
+            buf = np.empty(size, dtype=np.uint8)
+            setattr(self, name, buf)
+        return buf
+
+_scratch = _Scratch()
+
+def b64encode_np(data):
+    """binascii.b2a_base64 without the newline, vectorised so NumPy can drop the GIL."""
+    src = np.frombuffer(data, dtype=np.uint8)
+    whole = len(src) // 3
+    out = _scratch.get("encoded", (whole + 1) * 4)
+    triples = src[:whole * 3].reshape(-1, 3)
+    quads = out[:whole * 4].reshape(-1, 4)
+    np.right_shift(triples[:, 0], 2, out=quads[:, 0])
+    quads[:, 1] = ((triples[:, 0] & 0x03) << 4) | (triples[:, 1] >> 4)
+    quads[:, 2] = ((triples[:, 1] & 0x0F) << 2) | (triples[:, 2] >> 6)
+    np.bitwise_and(triples[:, 2], 0x3F, out=quads[:, 3])
+    np.take(_B64_ALPHABET, out[:whole * 4], out=out[:whole * 4])
+    n = whole * 4
+    if len(src) > whole * 3:
+        tail = binascii.b2a_base64(src[whole * 3:].tobytes(), newline=False)
+        out[n:n + 4] = np.frombuffer(tail, dtype=np.uint8)
+        n += 4
+    return out[:n].tobytes().decode("ascii")
+
+def b64decode_np(text):
+    """binascii.a2b_base64 for unbroken, padded base64 such as realtime audio deltas."""
+    src = np.frombuffer(text.encode("ascii") if isinstance(text, str) else text, dtype=np.uint8)
+    if len(src) % 4:
+        raise binascii.Error("Incorrect padding")
+    # The last quad may be padded; binascii handles it
+    whole = len(src) // 4 - (1 if len(src) and src[-1] == _PAD else 0)
+    values = _B64_VALUES[src[:whole * 4]].reshape(-1, 4)
+    if (values == 255).any():
+        raise binascii.Error("Non-base64 digit found")
+    out = _scratch.get("decoded", (whole + 1) * 3)
+    triples = out[:whole * 3].reshape(-1, 3)
+    triples[:, 0] = (values[:, 0] << 2) | (values[:, 1] >> 4)
+    triples[:, 1] = (values[:, 1] << 4) | (values[:, 2] >> 2)
+    triples[:, 2] = (values[:, 2] << 6) | values[:, 3]
+    n = whole * 3
+    if len(src) > whole * 4:
+        tail = binascii.a2b_base64(src[whole * 4:].tobytes())
+        out[n:n + len(tail)] = np.frombuffer(tail, dtype=np.uint8)
+        n += len(tail)
+    return out[:n].tobytes()
+
+class CodecExecutor:
+    """Runs audio codec and base64 work inline when small, on a thread pool when large.
+
+    binascii is faster per call but holds the GIL, so a large payload stalls
+    every session on the loop. Above the threshold the work goes to the NumPy
+    implementations above instead, which release the GIL. Jobs submitted in
+    the same loop iteration are sent to the pool as one batch. Each client
+    awaits its jobs in turn, so the stateful resamplers see chunks in order.
+    """
+
+    def __init__(self, threads=CODEC_THREADS, threshold=CODEC_OFFLOAD_BYTES):
+        self.threshold = threshold
+        self.pool = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix="codec")
+        self.batch = []
+        self.inline = 0
+        self.offloaded = 0
+        self.batches = 0
+
+    async def encode(self, codec, pcm):
+        """Session PCM -> base64 of the wire format."""
+        if len(pcm) < self.threshold:
+            self.inline += 1
+            return binascii.b2a_base64(codec.encode(pcm), newline=False).decode("ascii")
+        return await self._submit(lambda: b64encode_np(codec.encode(pcm)))
+
+    async def decode(self, codec, b64):
+        """Base64 of the wire format -> session PCM."""
+        if len(b64) < self.threshold:
+            self.inline += 1
+            return codec.decode(binascii.a2b_base64(b64))
+        return await self._submit(lambda: codec.decode(b64decode_np(b64)))
+
+    def _submit(self, job):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.batch:
+            loop.call_soon(self._flush, loop)
+        self.batch.append((job, future))
+        self.offloaded += 1
+        return future
+
+    def _flush(self, loop):
+        batch, self.batch = self.batch, []
+        self.batches += 1
+        self.pool.submit(self._run_batch, loop, batch)
+
+    @staticmethod
+    def _run_batch(loop, batch):
+        for job, future in batch:
+            try:
+                result = job()
+            except Exception as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result, None)
+
+    def metrics(self):
+        return {"inline": self.inline, "offloaded": self.offloaded, "batches": self.batches}
+
+def _resolve(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+_shared_executor = None
+
+def shared_codec_executor():
+    """One pool per process, shared by every session on the loop."""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = CodecExecutor()
+    return _shared_executor
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task, i.e. how long callbacks stall it."""
+
+    def __init__(self, interval_ms=LOOP_LAG_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = collections.deque(maxlen=LOOP_LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.task = None
+
+    def start(self):
+        if self.interval > 0:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def metrics(self):
+        if not self.samples:
+            return {"loop_lag_p99_ms": None, "loop_lag_max_ms": None}
+        return {
+            "loop_lag_p99_ms": float(np.percentile(self.samples, 99)) * 1000,
+            "loop_lag_max_ms": self.max_lag * 1000,
+        }
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
@@ -0,0 +1,77 @@
+import json
+import binascii
+from codec_executor import CODEC_OFFLOAD_BYTES
+
+# Use a faster JSON backend for the events that do need a full parse, when one is installed
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        json_loads = msgspec.json.decode
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        json_loads = json.loads
+        JSON_BACKEND = "json"
+
+AUDIO_DELTA = "response.audio.delta"
+
+def _string_span(message, key):
+    """(start, end) of a string field's value in the raw frame, or None if it isn't a plain string."""
+    marker = f'"{key}":'
+    pos = message.find(marker)
+    if pos < 0:
+        return None
+    pos += len(marker)
+    while pos < len(message) and message[pos] == " ":
+        pos += 1
+    if pos == len(message) or message[pos] != '"':
+        return None
+    end = message.find('"', pos + 1)
+    return None if end < 0 else (pos + 1, end)
+
+def _string_field(message, key):
+    span = _string_span(message, key)
+    if span is None:
+        return None
+    value = message[span[0]:span[1]]
+    # Escaped content needs the real parser
+    return None if "\\" in value else value
+
+def peek_type(message):
+    return _string_field(message, "type")
+
+def decode_event(message):
+    """Parses one realtime frame, skipping the JSON parser for audio deltas.
+
+    An audio delta is reduced to its type, ids and the base64-decoded audio
+    under "audio"; its large "delta" string is never materialised as a dict
+    value. Deltas above CODEC_OFFLOAD_BYTES keep the raw base64 under "delta"
+    so it can be decoded off the loop. Every other event goes through the
+    full JSON backend.
+    """
+    if peek_type(message) == AUDIO_DELTA:
+        span = _string_span(message, "delta")
+        # Escaped base64 (a JSON encoder may write "/" as "\/") needs the real parser
+        if span is not None and message.find("\\", span[0], span[1]) < 0:
+            start, end = span
+            if end - start >= CODEC_OFFLOAD_BYTES:
+                return {
+                    "type": AUDIO_DELTA,
+                    "response_id": _string_field(message, "response_id"),
+                    "item_id": _string_field(message, "item_id"),
+                    "delta": message[start:end],
+                }
+            try:
+                audio = binascii.a2b_base64(message[start:end])
+            except binascii.Error:
+                return json_loads(message)
+            return {
+                "type": AUDIO_DELTA,
+                "response_id": _string_field(message, "response_id"),
+                "item_id": _string_field(message, "item_id"),
+                "audio": audio,
+            }
+    return json_loads(message)
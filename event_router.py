@@ -0,0 +1,72 @@
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Event = Dict[str, Any]
+EventHandler = Callable[[Event], Awaitable[None]]
+# Middleware sees every event before dispatch and returns it (possibly modified) or None to drop it
+Middleware = Callable[[Event], Awaitable[Optional[Event]]]
+
+class HandlerStats:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration):
+        self.calls += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+class EventRouter:
+    """Dispatches realtime events to the handlers registered for their type with one dict lookup."""
+
+    def __init__(self):
+        # Each handler is stored with its stats so dispatch needn't look them up per call
+        self.handlers: Dict[str, List[Tuple[EventHandler, HandlerStats]]] = {}
+        self.middleware: List[Middleware] = []
+        self.stats: Dict[str, HandlerStats] = {}
+        self.unhandled: Dict[str, int] = {}
+
+    def add_handler(self, event_type: str, handler: EventHandler):
+        stats = self.stats.setdefault(f"{event_type} -> {handler.__qualname__}", HandlerStats())
+        self.handlers.setdefault(event_type, []).append((handler, stats))
+
+    def on(self, event_type: str):
+        def decorator(handler: EventHandler) -> EventHandler:
+            self.add_handler(event_type, handler)
+            return handler
+        return decorator
+
+    def use(self, middleware: Middleware):
+        self.middleware.append(middleware)
+
+    async def dispatch(self, event: Event):
+        for middleware in self.middleware:
+            event = await middleware(event)
+            if event is None:
+                return
+        event_type = event.get("type")
+        handlers = self.handlers.get(event_type)
+        if not handlers:
+            self.unhandled[event_type] = self.unhandled.get(event_type, 0) + 1
+            return
+        for handler, stats in handlers:
+            start = time.perf_counter()
+            await handler(event)
+            stats.record(time.perf_counter() - start)
+
+    def log_stats(self):
+        """Logs where time went on the receive path, most expensive handler first."""
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+        for name, stats in ranked:
+            if stats.calls:
+                logging.info(
+                    f"⏱️ {name}: {stats.calls} calls, {stats.total * 1000:.1f}ms total, "
+                    f"{stats.total / stats.calls * 1e6:.0f}µs avg, {stats.max * 1000:.1f}ms max"
+                )
+        if self.unhandled:
+            logging.debug(f"Unhandled event types: {self.unhandled}")
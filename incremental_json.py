@@ -0,0 +1,121 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+class IncrementalJSONObject:
+    """Parses a JSON object as it streams in, exposing each member once its value is complete.
+
+    Used on function_call_arguments deltas: a member is only reported after
+    the character ending its value has arrived, so a number like 12 is not
+    mistaken for a finished 1. Malformed input sets `failed` and stops parsing.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0  # start of the first member not parsed yet
+        self.started = False
+        self.closed = False
+        self.failed = False
+        self.members = {}
+
+    def has(self, keys):
+        return all(key in self.members for key in keys)
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.closed or self.failed:
+            return self.members
+        try:
+            self._parse()
+        except ValueError:
+            self.failed = True
+        return self.members
+
+    def _skip_whitespace(self, pos):
+        while pos < len(self.buffer) and self.buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _string_end(self, pos):
+        """Index just past the string starting at pos, or None if it hasn't closed yet."""
+        end = pos
+        while True:
+            end = self.buffer.find('"', end + 1)
+            if end == -1:
+                return None
+            backslashes = 0
+            while self.buffer[end - 1 - backslashes] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return end + 1
+
+    def _value_end(self, pos):
+        first = self.buffer[pos]
+        if first == '"':
+            return self._string_end(pos)
+        if first in "{[":
+            depth = 0
+            i = pos
+            while i < len(self.buffer):
+                char = self.buffer[i]
+                if char == '"':
+                    i = self._string_end(i)
+                    if i is None:
+                        return None
+                    continue
+                if char in "{[":
+                    depth += 1
+                elif char in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+                i += 1
+            return None
+        # Numbers and literals end at the next delimiter, which may not have arrived yet
+        i = pos
+        while i < len(self.buffer) and self.buffer[i] not in ",}" + _WHITESPACE:
+            i += 1
+        return i if i < len(self.buffer) else None
+
+    def _parse(self):
+        pos = self._skip_whitespace(self.pos)
+        if not self.started:
+            if pos == len(self.buffer):
+                return
+            if self.buffer[pos] != "{":
+                raise ValueError("Expected an object")
+            self.started = True
+            pos += 1
+            self.pos = pos
+        while True:
+            pos = self._skip_whitespace(pos)
+            if pos == len(self.buffer):
+                break
+            if self.buffer[pos] == "}":
+                self.closed = True
+                pos += 1
+                break
+            if self.buffer[pos] == "," and self.members:
+                pos = self._skip_whitespace(pos + 1)
+                if pos == len(self.buffer):
+                    break
+            key_end = self._string_end(pos) if self.buffer[pos] == '"' else None
+            if key_end is None:
+                if self.buffer[pos] != '"':
+                    raise ValueError("Expected a member name")
+                break
+            colon = self._skip_whitespace(key_end)
+            if colon == len(self.buffer):
+                break
+            if self.buffer[colon] != ":":
+                raise ValueError("Expected ':'")
+            value_start = self._skip_whitespace(colon + 1)
+            if value_start == len(self.buffer):
+                break
+            value_end = self._value_end(value_start)
+            if value_end is None:
+                break
+            self.members[json.loads(self.buffer[pos:key_end])] = json.loads(self.buffer[value_start:value_end])
+            pos = self.pos = value_end
+        if self.closed:
+            self.pos = pos
@@ -0,0 +1,293 @@
+"""Local stand-in for the Realtime API, for offline load and latency tests.
+
+Speaks the subset of the protocol OpenAIRealtimeClient uses: session.update,
+input_audio_buffer.append/commit with an energy-based server_vad, scripted
+response.* streams (audio, text and function calls), response.cancel and
+conversation.item.create/truncate. Delays and failures are configurable.
+
+    python mock_realtime_server.py --port 8765 [--script script.json]
+    OPENAI_REALTIME_URL=ws://127.0.0.1:8765 OPENAI_API_KEY=mock python workflow.py
+
+A script is a JSON list of responses, used in order and then repeated:
+    [{"text": "Hi there", "audio_ms": 1200},
+     {"function_call": {"name": "create_file", "arguments": {"file_name": "a.txt", "content": "x"}}},
+     {"function_calls": [{"name": "delete_file", "arguments": {"file_name": "a.txt"}}, ...]}]
+"""
+import sys
+import json
+import uuid
+import base64
+import random
+import asyncio
+import logging
+import argparse
+import numpy as np
+import websockets
+from audio_codec import AudioCodec
+from vad import EnergyVAD, VAD_FRAME_MS
+
+DEFAULT_SCRIPT = [{"text": "This is a scripted reply from the mock realtime server.", "audio_ms": 1500}]
+
+def _id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+
+class MockRealtimeServer:
+    def __init__(self, script=None, first_delta_delay_ms=150, delta_interval_ms=20, delta_ms=100,
+                 session_delay_ms=0, handshake_delay_ms=0, error_rate=0.0, drop_after_events=None):
+        self.script = script or DEFAULT_SCRIPT
+        self.first_delta_delay = first_delta_delay_ms / 1000
+        self.delta_interval = delta_interval_ms / 1000
+        self.delta_ms = delta_ms
+        self.session_delay = session_delay_ms / 1000
+        self.handshake_delay = handshake_delay_ms / 1000  # stands in for DNS, TCP and TLS setup
+        self.error_rate = error_rate  # chance that a response fails with a server_error event
+        self.drop_after_events = drop_after_events  # abruptly close each connection after N sent events
+        self.server = None
+        self.port = None
+        self.sessions = 0
+        self.received = {}
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await websockets.serve(
+            self._handle, host, port, max_size=None, process_request=self._process_request
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Mock realtime server listening on ws://{host}:{self.port}")
+        return self
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _process_request(self, path, headers):
+        await asyncio.sleep(self.handshake_delay)
+
+    async def _handle(self, websocket, *args):
+        self.sessions += 1
+        await MockSession(self, websocket).run()
+
+class MockSession:
+    def __init__(self, server, websocket):
+        self.server = server
+        self.websocket = websocket
+        self.codec = AudioCodec("pcm16")
+        self.vad = EnergyVAD()
+        self.silence_ms = 400
+        self.server_vad = True
+        self.input_audio = bytearray()
+        self.vad_pending = bytearray()
+        self.speaking = False
+        self.silent_ms = 0
+        self.audio_ms = 0
+        self.script_index = 0
+        self.response_task = None
+        self.sent_events = 0
+
+    async def send(self, event):
+        event.setdefault("event_id", _id("event"))
+        await self.websocket.send(json.dumps(event))
+        self.sent_events += 1
+        if self.server.drop_after_events and self.sent_events >= self.server.drop_after_events:
+            # Simulate a dropped link: no close handshake
+            self.websocket.transport.abort()
+
+    async def run(self):
+        await self.send({"type": "session.created", "session": {"id": _id("sess")}})
+        try:
+            async for message in self.websocket:
+                event = json.loads(message)
+                event_type = event.get("type")
+                self.server.received[event_type] = self.server.received.get(event_type, 0) + 1
+                handler = getattr(self, "on_" + event_type.replace(".", "_"), None)
+                if handler:
+                    await handler(event)
+                else:
+                    await self.error("invalid_request_error", f"Unsupported event type '{event_type}'")
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self.response_task:
+                self.response_task.cancel()
+
+    async def error(self, code, message):
+        await self.send({"type": "error", "error": {"type": code, "code": code, "message": message}})
+
+    async def on_session_update(self, event):
+        session = event.get("session", {})
+        audio_format = session.get("input_audio_format", "pcm16")
+        self.codec = AudioCodec(audio_format)
+        turn_detection = session.get("turn_detection") or {}
+        self.server_vad = turn_detection.get("type") == "server_vad"
+        self.silence_ms = turn_detection.get("silence_duration_ms", 400)
+        await asyncio.sleep(self.server.session_delay)
+        await self.send({"type": "session.updated", "session": session})
+
+    async def on_input_audio_buffer_append(self, event):
+        audio = base64.b64decode(event["audio"])
+        self.input_audio += audio
+        if self.server_vad:
+            await self._detect_speech(self.codec.decode(audio))
+
+    async def _detect_speech(self, pcm):
+        # Runs the client's EnergyVAD over the decoded 24 kHz audio, frame by frame
+        frame_bytes = 24000 * VAD_FRAME_MS // 1000 * 2
+        self.vad_pending += pcm
+        while len(self.vad_pending) >= frame_bytes:
+            frame = bytes(self.vad_pending[:frame_bytes])
+            del self.vad_pending[:frame_bytes]
+            self.audio_ms += VAD_FRAME_MS
+            if self.vad.is_speech(frame):
+                self.silent_ms = 0
+                if not self.speaking:
+                    self.speaking = True
+                    await self.send({"type": "input_audio_buffer.speech_started",
+                                     "audio_start_ms": self.audio_ms, "item_id": _id("item")})
+            elif self.speaking:
+                self.silent_ms += VAD_FRAME_MS
+                if self.silent_ms >= self.silence_ms:
+                    self.speaking = False
+                    await self.send({"type": "input_audio_buffer.speech_stopped",
+                                     "audio_end_ms": self.audio_ms, "item_id": _id("item")})
+                    await self._commit()
+                    self._start_response()
+
+    async def _commit(self):
+        self.input_audio.clear()
+        await self.send({"type": "input_audio_buffer.committed", "item_id": _id("item")})
+
+    async def on_input_audio_buffer_commit(self, event):
+        if not self.input_audio:
+            await self.error("invalid_request_error",
+                             "Error committing input audio buffer: the buffer is empty.")
+            return
+        await self._commit()
+
+    async def on_input_audio_buffer_clear(self, event):
+        self.input_audio.clear()
+        await self.send({"type": "input_audio_buffer.cleared"})
+
+    async def on_conversation_item_create(self, event):
+        item = dict(event.get("item", {}), id=_id("item"))
+        await self.send({"type": "conversation.item.created", "item": item})
+
+    async def on_conversation_item_truncate(self, event):
+        await self.send({"type": "conversation.item.truncated", "item_id": event.get("item_id"),
+                         "content_index": event.get("content_index", 0), "audio_end_ms": event.get("audio_end_ms")})
+
+    async def on_response_create(self, event):
+        if self.response_task and not self.response_task.done():
+            await self.error("invalid_request_error", "Conversation already has an active response")
+            return
+        self._start_response()
+
+    async def on_response_cancel(self, event):
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+
+    def _start_response(self):
+        step = self.server.script[self.script_index % len(self.server.script)]
+        self.script_index += 1
+        self.response_task = asyncio.create_task(self._stream_response(step))
+
+    async def _stream_response(self, step):
+        try:
+            await self._respond(step)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _respond(self, step):
+        response_id = _id("resp")
+        ids = {"response_id": response_id, "output_index": 0}
+        status = "completed"
+        await self.send({"type": "response.created", "response": {"id": response_id, "status": "in_progress"}})
+        try:
+            await asyncio.sleep(self.server.first_delta_delay)
+            if random.random() < self.server.error_rate:
+                await self.error("server_error", "Injected server error")
+                status = "failed"
+            elif "function_call" in step or "function_calls" in step:
+                calls = step.get("function_calls") or [step["function_call"]]
+                for index, call in enumerate(calls):
+                    await self._stream_function_call(call, dict(ids, output_index=index))
+            else:
+                await self._stream_message(step, ids)
+        except asyncio.CancelledError:
+            status = "cancelled"
+        await self.send({"type": "response.done", "response": {"id": response_id, "status": status}})
+
+    async def _stream_function_call(self, call, ids):
+        item_id = _id("item")
+        call_id = _id("call")
+        arguments = json.dumps(call.get("arguments", {}))
+        await self.send({"type": "response.output_item.added", **ids, "item": {
+            "id": item_id, "type": "function_call", "name": call["name"], "call_id": call_id, "arguments": ""}})
+        for start in range(0, len(arguments), 16):
+            await self.send({"type": "response.function_call_arguments.delta", **ids, "item_id": item_id,
+                             "call_id": call_id, "delta": arguments[start:start + 16]})
+            await asyncio.sleep(self.server.delta_interval)
+        await self.send({"type": "response.function_call_arguments.done", **ids, "item_id": item_id,
+                         "call_id": call_id, "arguments": arguments})
+
+    async def _stream_message(self, step, ids):
+        item_id = _id("item")
+        ids = dict(ids, item_id=item_id, content_index=0)
+        await self.send({"type": "response.output_item.added", "response_id": ids["response_id"],
+                         "output_index": 0, "item": {"id": item_id, "type": "message", "role": "assistant"}})
+        words = step.get("text", "").split()
+        audio = self._tone(step.get("audio_ms", 0))
+        chunk = 24000 * self.server.delta_ms // 1000 * 2
+        deltas = max(len(words), -(-len(audio) // chunk))
+        codec = AudioCodec(self.codec.name)
+        for i in range(deltas):
+            if i < len(words):
+                await self.send({"type": "response.text.delta", **ids, "delta": words[i] + " "})
+            piece = audio[i * chunk:(i + 1) * chunk]
+            if piece:
+                await self.send({"type": "response.audio.delta", **ids,
+                                 "delta": base64.b64encode(codec.encode(piece)).decode("ascii")})
+            await asyncio.sleep(self.server.delta_interval)
+        await self.send({"type": "response.text.done", **ids, "text": step.get("text", "")})
+        await self.send({"type": "response.audio.done", **ids})
+
+    @staticmethod
+    def _tone(duration_ms):
+        t = np.arange(24000 * duration_ms // 1000) / 24000
+        return (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+async def serve_forever(args):
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    server = MockRealtimeServer(
+        script=script,
+        first_delta_delay_ms=args.first_delta_delay_ms,
+        delta_interval_ms=args.delta_interval_ms,
+        session_delay_ms=args.session_delay_ms,
+        handshake_delay_ms=args.handshake_delay_ms,
+        error_rate=args.error_rate,
+        drop_after_events=args.drop_after_events,
+    )
+    await server.start(args.host, args.port)
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script")
+    parser.add_argument("--first-delta-delay-ms", type=float, default=150)
+    parser.add_argument("--delta-interval-ms", type=float, default=20)
+    parser.add_argument("--session-delay-ms", type=float, default=0)
+    parser.add_argument("--handshake-delay-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-after-events", type=int)
+    try:
+        asyncio.run(serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -2,46 +2,138 @@ import asyncio
 import json
 import logging
 import os
-import base64
+import random
+import collections
 import websockets
-from websockets.exceptions import ConnectionClosedError
+from websockets.exceptions import ConnectionClosed
 from dotenv import load_dotenv
 import time
+from utils import log_runtime
+from audio_codec import AudioCodec
+from audio_framing import AudioFramer, UploadStats, append_message
+from event_decoder import decode_event
+from send_queue import SendQueue, PRIORITY_AUDIO
+from codec_executor import shared_codec_executor, LoopLagMonitor
 
 # Load environment variables
 load_dotenv()
 
+# Point at mock_realtime_server.py (e.g. ws://127.0.0.1:8765) to run without the real API
+REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
+)
+
+# Append every incoming frame to this file, e.g. to replay it in benchmarks/bench_event_decode.py
+REALTIME_RECORD_FILE = os.getenv("REALTIME_RECORD_FILE")
+
+# Reconnect with jittered exponential backoff when the WebSocket drops
+RECONNECT_MAX_ATTEMPTS = int(os.getenv("RECONNECT_MAX_ATTEMPTS", "8"))
+RECONNECT_BASE_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+# Seconds of outgoing audio held while the link is down, replayed once it is back
+OUTAGE_AUDIO_BUFFER_SECONDS = 5
+
+# Synthetic event returned by receive_event after a reconnect; the previous response is gone
+RECONNECTED_EVENT = "client.reconnected"
+
+EVENT_EMOJIS = {
+    "session.update": "🛠️",
+    "session.created": "🔌",
+    "session.updated": "🔄",
+    "input_audio_buffer.commit": "✅",
+    "input_audio_buffer.speech_started": "🗣️",
+    "input_audio_buffer.speech_stopped": "🤫",
+    "input_audio_buffer.cleared": "🧹",
+    "input_audio_buffer.committed": "📨",
+    "conversation.item.create": "📥",
+    "conversation.item.delete": "🗑️",
+    "conversation.item.truncate": "✂️",
+    "conversation.item.created": "📤",
+    "conversation.item.deleted": "🗑️",
+    "conversation.item.truncated": "✂️",
+    "response.create": "➡️",
+    "response.created": "📝",
+    "response.output_item.added": "➕",
+    "response.output_item.done": "✅",
+    "response.text.delta": "✍️",
+    "response.text.done": "📝",
+    "response.audio.delta": "🔊",
+    "response.audio.done": "🔇",
+    "response.done": "✔️",
+    "response.cancel": "⛔",
+    "response.function_call_arguments.delta": "📥",
+    "response.function_call_arguments.done": "📥",
+    "rate_limits.updated": "⏳",
+    "error": "❌",
+    "conversation.item.input_audio_transcription.completed": "📝",
+    "conversation.item.input_audio_transcription.failed": "⚠️",
+}
+
+class ReconnectPolicy:
+    def __init__(self, max_attempts=RECONNECT_MAX_ATTEMPTS, base_delay=RECONNECT_BASE_DELAY, max_delay=RECONNECT_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        # "Full jitter": spreads out clients that all lost the link at the same moment
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
 class OpenAIRealtimeClient:
-    def __init__(self, session_instructions, tools):
+    """Realtime API WebSocket client that transparently reconnects.
+
+    On a dropped link it redials with backoff, replays the cached
+    session.update and sends any audio captured during the outage. The
+    server-side conversation does not survive a reconnect, so receive_event
+    yields a client.reconnected event for the caller to reset its turn state.
+    """
+
+    def __init__(self, session_instructions, tools, codec=None, reconnect_policy=None, url=None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("Please set the OPENAI_API_KEY in your .env file.")
-        self.url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
+        self.url = url or REALTIME_URL
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "OpenAI-Beta": "realtime=v1",
         }
         self.session_instructions = session_instructions
         self.tools = tools
+        self.codec = codec or AudioCodec()
+        self.framer = AudioFramer(self.codec)
+        self.codec_executor = shared_codec_executor()
+        self.loop_lag = LoopLagMonitor()
+        self.upload_stats = UploadStats()
         self.websocket = None
-        self.audio_append_count = 0
-        self.last_audio_append_log_time = 0
-        self.AUDIO_APPEND_LOG_INTERVAL = 1
-        self.AUDIO_APPEND_LOG_TIME_INTERVAL = 1
+        self.send_queue = SendQueue()
+        self.writer_task = None
+        self.session_update = None
+        self.reconnect_policy = reconnect_policy or ReconnectPolicy()
+        self.connected = asyncio.Event()
+        self.reconnect_task = None
+        self.reconnect_error = None
+        self.reconnect_pending = False  # a reconnect happened that receive_event hasn't reported yet
+        self.closing = False
+        self.outage_audio = collections.deque()
+        self.outage_audio_bytes = 0
+        # base64 inflates the wire audio by 4/3
+        self.outage_audio_limit = int(self.codec.wire_bytes_per_second * OUTAGE_AUDIO_BUFFER_SECONDS * 4 / 3)
+        self.outage_audio_dropped = 0
+        self.connect_latency = None
+        self.reconnect_latency = None
+        self.reconnects = 0
+        self.record_file = open(REALTIME_RECORD_FILE, "a") if REALTIME_RECORD_FILE else None
 
     async def connect(self):
-        self.websocket = await websockets.connect(self.url, extra_headers=self.headers)
-        logging.info("Connected to the server.")
-
-        # Initialize the session
-        session_update = {
+        # Initialize the session; cached so a reconnect can replay it
+        self.session_update = {
             "type": "session.update",
             "session": {
                 "modalities": ["text", "audio"],
                 "instructions": self.session_instructions,
                 "voice": "alloy",
-                "input_audio_format": "pcm16",
-                "output_audio_format": "pcm16",
+                "input_audio_format": self.codec.name,
+                "output_audio_format": self.codec.name,
                 "turn_detection": {
                     "type": "server_vad",
                     "threshold": 0.5,
@@ -51,81 +143,185 @@ class OpenAIRealtimeClient:
                 "tools": self.tools,
             },
         }
-        await self.send_event(session_update)
+        start_time = time.perf_counter()
+        await self._open()
+        self.connect_latency = time.perf_counter() - start_time
+        log_runtime("realtime_connect", self.connect_latency)
+        self.writer_task = asyncio.create_task(self._writer())
+        self.loop_lag.start()
+
+    async def _open(self):
+        self.websocket = await websockets.connect(self.url, extra_headers=self.headers)
+        logging.info("Connected to the server.")
+        await self.websocket.send(json.dumps(self.session_update))
+        self.log_ws_event("Outgoing", self.session_update)
+        self.connected.set()
+
+    def _connection_lost(self, error):
+        if self.closing or not self.connected.is_set():
+            return
+        logging.warning(f"WebSocket connection lost ({error}), reconnecting...")
+        self.connected.clear()
+        # Audio queued before the drop was noticed is older than anything captured during the outage
+        for message, _ in self.send_queue.take_audio():
+            self._buffer_outage_audio(message)
+        if self.reconnect_task is None or self.reconnect_task.done():
+            self.reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        start_time = time.perf_counter()
+        for attempt in range(self.reconnect_policy.max_attempts):
+            await asyncio.sleep(self.reconnect_policy.delay(attempt))
+            try:
+                await self._open()
+            except (OSError, ConnectionClosed, websockets.InvalidHandshake) as e:
+                logging.warning(f"Reconnect attempt {attempt + 1} failed: {e}")
+                continue
+            self.reconnects += 1
+            self.reconnect_pending = True
+            self.reconnect_latency = time.perf_counter() - start_time
+            log_runtime("realtime_reconnect", self.reconnect_latency)
+            self._replay_outage_audio()
+            return
+        self.reconnect_error = ConnectionError(
+            f"Could not reconnect after {self.reconnect_policy.max_attempts} attempts"
+        )
+        logging.error(str(self.reconnect_error))
+        self.connected.set()  # wake everyone waiting so they see reconnect_error
+
+    async def _wait_connected(self):
+        if not self.connected.is_set() and not self.closing:
+            await self.connected.wait()
+        if self.reconnect_error:
+            raise self.reconnect_error
+
+    def _buffer_outage_audio(self, message):
+        self.outage_audio.append(message)
+        self.outage_audio_bytes += len(message)
+        while self.outage_audio_bytes > self.outage_audio_limit:
+            dropped = self.outage_audio.popleft()
+            self.outage_audio_bytes -= len(dropped)
+            self.outage_audio_dropped += 1
+
+    def _replay_outage_audio(self):
+        if not self.outage_audio:
+            return
+        logging.info(f"Replaying {len(self.outage_audio)} audio frames buffered during the outage")
+        now = time.perf_counter()
+        self.send_queue.requeue(PRIORITY_AUDIO, [(message, now) for message in self.outage_audio])
+        self.outage_audio.clear()
+        self.outage_audio_bytes = 0
+
+    async def _writer(self):
+        """The only task that writes to the socket, so a slow write never stalls the callers."""
+        while True:
+            priority, message, enqueued_at = await self.send_queue.get()
+            try:
+                while True:
+                    await self._wait_connected()
+                    try:
+                        await self.websocket.send(message)
+                        break
+                    except ConnectionClosed as e:
+                        self._connection_lost(e)
+            except ConnectionError as e:
+                logging.error(f"Send writer stopped: {e}")
+                return
+            self.send_queue.record_sent(enqueued_at)
+            if priority == PRIORITY_AUDIO:
+                self.upload_stats.record(len(message))
 
     async def send_event(self, event):
         if not self.websocket:
             raise ValueError("WebSocket connection not established.")
-        await self.websocket.send(json.dumps(event))
+        if self.reconnect_error:
+            raise self.reconnect_error
+        if event["type"] == "input_audio_buffer.commit":
+            # Audio still held back by the framer belongs to the turn being committed
+            await self.flush_audio()
+        self.send_queue.put_event(event["type"], json.dumps(event))
         self.log_ws_event("Outgoing", event)
 
     async def receive_event(self):
         if not self.websocket:
             raise ValueError("WebSocket connection not established.")
-        message = await self.websocket.recv()
-        event = json.loads(message)
+        while True:
+            await self._wait_connected()
+            if self.reconnect_pending:
+                self.reconnect_pending = False
+                return {"type": RECONNECTED_EVENT, "reconnect_latency": self.reconnect_latency}
+            try:
+                message = await self.websocket.recv()
+                break
+            except ConnectionClosed as e:
+                if self.closing:
+                    raise
+                self._connection_lost(e)
+        if self.record_file:
+            self.record_file.write(message + "\n")
+        event = decode_event(message)
         self.log_ws_event("Incoming", event)
         return event
 
     async def send_audio(self, audio_data):
-        base64_audio = base64.b64encode(audio_data).decode("utf-8")
-        if base64_audio:
-            audio_event = {
-                "type": "input_audio_buffer.append",
-                "audio": base64_audio,
-            }
-            await self.send_event(audio_event)
-            
-            # Update audio append count and log if necessary
-            self.audio_append_count += 1
-            current_time = time.time()
-            if (self.audio_append_count % self.AUDIO_APPEND_LOG_INTERVAL == 0 and 
-                current_time - self.last_audio_append_log_time >= self.AUDIO_APPEND_LOG_TIME_INTERVAL):
-                logging.debug(f"Sent {self.audio_append_count} audio append events")
-                self.last_audio_append_log_time = current_time
+        for frame in self.framer.push(audio_data):
+            await self._send_audio_frame(frame)
+
+    async def flush_audio(self):
+        frame = self.framer.flush()
+        if frame:
+            await self._send_audio_frame(frame)
+
+    async def _send_audio_frame(self, frame):
+        if not self.websocket:
+            raise ValueError("WebSocket connection not established.")
+        message = append_message(await self.codec_executor.encode(self.codec, frame))
+        if self.connected.is_set():
+            self.send_queue.put_audio(message)
         else:
-            logging.debug("No audio data to send")
+            self._buffer_outage_audio(message)
+
+    async def ping(self, timeout=5.0):
+        """Round-trip time of a WebSocket ping in seconds; raises if the link is dead."""
+        start_time = time.perf_counter()
+        pong = await self.websocket.ping()
+        await asyncio.wait_for(pong, timeout)
+        return time.perf_counter() - start_time
+
+    def metrics(self):
+        return {
+            "connect_latency_ms": self.connect_latency * 1000 if self.connect_latency is not None else None,
+            "reconnect_latency_ms": self.reconnect_latency * 1000 if self.reconnect_latency is not None else None,
+            "reconnects": self.reconnects,
+            "outage_audio_dropped": self.outage_audio_dropped,
+            "send_queue": self.send_queue.metrics(),
+            "codec": self.codec_executor.metrics(),
+            **self.loop_lag.metrics(),
+        }
+
+    async def decode_audio(self, event):
+        audio = event.get("audio")  # small deltas are already base64-decoded by decode_event
+        if audio is None:
+            return await self.codec_executor.decode(self.codec, event["delta"])
+        return self.codec.decode(audio)
 
     async def close(self):
+        self.closing = True
+        self.loop_lag.stop()
+        if self.reconnect_task:
+            self.reconnect_task.cancel()
+        if self.writer_task:
+            self.writer_task.cancel()
         if self.websocket:
             await self.websocket.close()
+        if self.record_file:
+            self.record_file.close()
 
     @staticmethod
     def log_ws_event(direction, event):
         event_type = event.get("type", "Unknown")
-        if event_type != "input_audio_buffer.append":  # Skip logging for audio append events
-            event_emojis = {
-                "session.update": "🛠️",
-                "session.created": "🔌",
-                "session.updated": "🔄",
-                "input_audio_buffer.commit": "✅",
-                "input_audio_buffer.speech_started": "🗣️",
-                "input_audio_buffer.speech_stopped": "🤫",
-                "input_audio_buffer.cleared": "🧹",
-                "input_audio_buffer.committed": "📨",
-                "conversation.item.create": "📥",
-                "conversation.item.delete": "🗑️",
-                "conversation.item.truncate": "✂️",
-                "conversation.item.created": "📤",
-                "conversation.item.deleted": "🗑️",
-                "conversation.item.truncated": "✂️",
-                "response.create": "➡️",
-                "response.created": "📝",
-                "response.output_item.added": "➕",
-                "response.output_item.done": "✅",
-                "response.text.delta": "✍️",
-                "response.text.done": "📝",
-                "response.audio.delta": "🔊",
-                "response.audio.done": "🔇",
-                "response.done": "✔️",
-                "response.cancel": "⛔",
-                "response.function_call_arguments.delta": "📥",
-                "response.function_call_arguments.done": "📥",
-                "rate_limits.updated": "⏳",
-                "error": "❌",
-                "conversation.item.input_audio_transcription.completed": "📝",
-                "conversation.item.input_audio_transcription.failed": "⚠️",
-            }
-            emoji = event_emojis.get(event_type, "❓")
+        # Skip audio append events, and don't format anything unless debug logging is on
+        if event_type != "input_audio_buffer.append" and logging.getLogger().isEnabledFor(logging.DEBUG):
+            emoji = EVENT_EMOJIS.get(event_type, "❓")
             icon = "⬆️ - Out" if direction == "Outgoing" else "⬇️ - In"
-            logging.debug(f"{emoji} {icon} {event_type}")
\ No newline at end of file
+            logging.debug(f"{emoji} {icon} {event_type}")
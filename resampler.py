@@ -0,0 +1,60 @@
+from math import gcd
+import numpy as np
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler for 16-bit audio.
+
+    Designs one windowed-sinc low-pass at the upsampled rate and splits it into
+    `up` phases. Input history and the fractional output position carry over
+    between calls, so consecutive chunks join without clicks or drift.
+    """
+
+    def __init__(self, src_rate, dst_rate, taps_per_phase=16):
+        g = gcd(src_rate, dst_rate)
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.up = dst_rate // g
+        self.down = src_rate // g
+        self.taps = taps_per_phase
+        n = taps_per_phase * self.up
+        cutoff = 0.5 / max(self.up, self.down)  # cycles per upsampled sample
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, 8.0)
+        h *= self.up / h.sum()
+        # phases[p, k] multiplies the input sample k steps behind the output position
+        self.phases = h.reshape(taps_per_phase, self.up).T.astype(np.float32)
+        self.history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self.position = 0  # upsampled index of the next output, relative to the next chunk
+
+    @property
+    def passthrough(self):
+        return self.up == self.down
+
+    def process(self, samples):
+        """Resample a 1-D int16 array, returning int16 at dst_rate."""
+        if self.passthrough:
+            return samples
+        n_in = samples.size
+        span = n_in * self.up - self.position
+        n_out = max(0, -(-span // self.down))
+        buf = np.concatenate((self.history, samples.astype(np.float32)))
+        u = self.position + np.arange(n_out) * self.down
+        index = (u // self.up + self.taps - 1)[:, None] - np.arange(self.taps)[None, :]
+        out = np.einsum("ij,ij->i", buf[index], self.phases[u % self.up])
+        self.position += n_out * self.down - n_in * self.up
+        self.history = buf[buf.size - (self.taps - 1):]
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+    def reset(self):
+        self.history[:] = 0
+        self.position = 0
+
+def to_mono(samples, channels):
+    if channels == 1:
+        return samples
+    return samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+
+def from_mono(samples, channels):
+    if channels == 1:
+        return samples
+    return np.repeat(samples, channels)
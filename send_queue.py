@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+import collections
+
+# Audio appends waiting for the socket beyond this are stale: the oldest are dropped
+SEND_QUEUE_MAX_AUDIO = int(os.getenv("SEND_QUEUE_MAX_AUDIO", "25"))
+
+# Lower goes first; anything not listed is ordinary control traffic
+PRIORITY_URGENT = 0
+PRIORITY_CONTROL = 1
+PRIORITY_AUDIO = 2
+EVENT_PRIORITIES = {
+    "response.cancel": PRIORITY_URGENT,
+    "conversation.item.truncate": PRIORITY_URGENT,
+}
+
+class SendQueue:
+    """Bounded priority queue feeding the single WebSocket writer task.
+
+    Control events jump ahead of audio appends and are never dropped. The audio
+    lane holds at most max_audio frames; under backpressure the oldest frame is
+    discarded. An input_audio_buffer.commit promotes the audio queued before it
+    so the turn it commits is still complete on the server.
+    """
+
+    def __init__(self, max_audio=SEND_QUEUE_MAX_AUDIO):
+        self.lanes = (collections.deque(), collections.deque(), collections.deque())
+        self.max_audio = max_audio
+        self.not_empty = asyncio.Event()
+        self.dropped_audio = 0
+        self.sent = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+    def put_event(self, event_type, message):
+        priority = EVENT_PRIORITIES.get(event_type, PRIORITY_CONTROL)
+        if event_type == "input_audio_buffer.commit":
+            self.lanes[PRIORITY_CONTROL].extend(self.lanes[PRIORITY_AUDIO])
+            self.lanes[PRIORITY_AUDIO].clear()
+        self.lanes[priority].append((message, time.perf_counter()))
+        self.not_empty.set()
+
+    def put_audio(self, message):
+        audio = self.lanes[PRIORITY_AUDIO]
+        if len(audio) >= self.max_audio:
+            audio.popleft()
+            self.dropped_audio += 1
+        audio.append((message, time.perf_counter()))
+        self.not_empty.set()
+
+    def take_audio(self):
+        """Removes and returns every queued audio entry, oldest first."""
+        entries = list(self.lanes[PRIORITY_AUDIO])
+        self.lanes[PRIORITY_AUDIO].clear()
+        return entries
+
+    def requeue(self, priority, entries):
+        """Puts entries back at the front of a lane, in order, bypassing the audio bound."""
+        self.lanes[priority].extendleft(reversed(entries))
+        if entries:
+            self.not_empty.set()
+
+    async def get(self):
+        """Returns (priority, message, enqueued_at) for the most urgent entry."""
+        while True:
+            for priority, lane in enumerate(self.lanes):
+                if lane:
+                    message, enqueued_at = lane.popleft()
+                    return priority, message, enqueued_at
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+    def record_sent(self, enqueued_at):
+        latency = time.perf_counter() - enqueued_at
+        self.sent += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    def metrics(self):
+        return {
+            "depth": [len(lane) for lane in self.lanes],
+            "sent": self.sent,
+            "dropped_audio": self.dropped_audio,
+            "avg_send_latency_ms": self.total_latency / self.sent * 1000 if self.sent else 0.0,
+            "max_send_latency_ms": self.max_latency * 1000,
+        }
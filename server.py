@@ -0,0 +1,315 @@
+"""Hosts many concurrent conversations in one process, one per connected caller.
+
+Callers connect over a local WebSocket. Binary messages carry 24 kHz mono
+PCM16 in both directions. Text messages carry JSON control events: the
+server sends {"type": "ready"}, {"type": "flush"} (drop queued playback,
+e.g. on barge-in) and {"type": "reply.done"}; a caller may send
+{"type": "hangup"}.
+
+Each caller gets its own OpenAIRealtimeClient and process_ws_messages state
+machine. All callers share one event loop and the tool registry in
+agent_tools. Audio buffered per session is capped in both directions.
+
+    python server.py [--port 8766] [--max-sessions 100] [--pool-size 2]
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import collections
+import websockets
+from websockets.exceptions import ConnectionClosed
+from dotenv import load_dotenv
+from audio_buffer import AudioRingBuffer
+from audio_format import RATE, BYTES_PER_FRAME, CHUNK, MIC_FRAMES_PER_UPLOAD, FULL_DUPLEX
+from barge_in import BargeInController
+from openai_client import OpenAIRealtimeClient
+from session_pool import RealtimeSessionPool
+from vad import LOCAL_VAD, VADGate
+from agent_tools import registry, tools
+from workflow import SESSION_INSTRUCTIONS, process_ws_messages, stream_microphone
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8766"))
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "100"))
+# Per-session cap on buffered audio, each direction; beyond it audio is dropped and counted
+SERVER_SESSION_BUFFER_SECONDS = float(os.getenv("SERVER_SESSION_BUFFER_SECONDS", "10"))
+# Largest single message accepted from a caller
+CALLER_MAX_MESSAGE_BYTES = 64 * 1024
+SERVER_METRICS_INTERVAL = 30.0
+
+class CallerMicrophone:
+    """AsyncMicrophone's interface, fed by audio arriving from the caller's socket."""
+
+    def __init__(self, frames_per_read=MIC_FRAMES_PER_UPLOAD, full_duplex=FULL_DUPLEX,
+                 buffer_seconds=SERVER_SESSION_BUFFER_SECONDS):
+        self.buffer = AudioRingBuffer(int(buffer_seconds * RATE) * BYTES_PER_FRAME)
+        self.read_bytes = frames_per_read * CHUNK * BYTES_PER_FRAME
+        self.data_ready = asyncio.Event()
+        self.is_recording = False
+        self.is_receiving = False
+        self.full_duplex = full_duplex
+
+    def write(self, data):
+        if self.is_recording and (self.full_duplex or not self.is_receiving):
+            self.buffer.write(data)
+            self.data_ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self.buffer.available < self.read_bytes:
+            self.data_ready.clear()
+            await self.data_ready.wait()
+        return self.buffer.read(self.read_bytes)
+
+    def start_recording(self):
+        self.is_recording = True
+
+    def stop_recording(self):
+        self.is_recording = False
+
+    def start_receiving(self):
+        self.is_receiving = True
+        if not self.full_duplex:
+            self.is_recording = False
+
+    def stop_receiving(self):
+        self.is_receiving = False
+
+    def close(self):
+        if self.buffer.overflows:
+            logging.warning(f"Caller audio buffer overflowed {self.buffer.overflows} times, "
+                            f"dropped {self.buffer.dropped_bytes} bytes")
+
+class CallerPlayer:
+    """AudioPlayer's interface, streaming the reply to the caller as it arrives.
+
+    The caller plays audio in real time, so the playhead is estimated from the
+    wall-clock time since the current stretch of playback started.
+    """
+
+    def __init__(self, websocket, buffer_seconds=SERVER_SESSION_BUFFER_SECONDS):
+        self.websocket = websocket
+        self.bytes_per_ms = RATE * BYTES_PER_FRAME / 1000
+        self.outbox = collections.deque()
+        self.outbox_bytes = 0
+        self.outbox_limit = int(buffer_seconds * RATE) * BYTES_PER_FRAME
+        self.outbox_ready = asyncio.Event()
+        self.dropped_bytes = 0
+        self.session_ms_enqueued = 0.0
+        self.segment_start_ms = 0.0  # session offset at which the current stretch of playback began
+        self.segment_started_at = time.perf_counter()
+        self.reply_bytes = 0
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+    @property
+    def session_ms_played(self):
+        elapsed = (time.perf_counter() - self.segment_started_at) * 1000
+        return min(self.session_ms_enqueued, self.segment_start_ms + elapsed)
+
+    @property
+    def queued_ms(self):
+        return self.session_ms_enqueued - self.session_ms_played
+
+    @property
+    def queued_bytes(self):
+        return int(self.queued_ms * self.bytes_per_ms)
+
+    def _send(self, message):
+        self.outbox.append(message)
+        self.outbox_bytes += len(message)
+        while self.outbox_bytes > self.outbox_limit:
+            dropped = self.outbox.popleft()
+            self.outbox_bytes -= len(dropped)
+            self.dropped_bytes += len(dropped)
+        self.outbox_ready.set()
+
+    async def sender(self):
+        while True:
+            await self.outbox_ready.wait()
+            while self.outbox:
+                message = self.outbox.popleft()
+                self.outbox_bytes -= len(message)
+                await self.websocket.send(message)
+            self.outbox_ready.clear()
+
+    def enqueue(self, chunk):
+        if not chunk:
+            return
+        if not self.queued_ms:
+            self.segment_start_ms = self.session_ms_enqueued
+            self.segment_started_at = time.perf_counter()
+        self.drained.clear()
+        self._send(bytes(chunk))
+        self.reply_bytes += len(chunk)
+        self.session_ms_enqueued += len(chunk) / self.bytes_per_ms
+
+    def flush(self):
+        dropped = self.queued_bytes
+        self.outbox = collections.deque(m for m in self.outbox if not isinstance(m, bytes))
+        self.outbox_bytes = sum(len(m) for m in self.outbox)
+        self.session_ms_enqueued = self.session_ms_played
+        self._send(json.dumps({"type": "flush"}))
+        self.drained.set()
+        return dropped
+
+    async def drain(self):
+        while self.queued_ms > 0:
+            await asyncio.sleep(self.queued_ms / 1000)
+        self.drained.set()
+
+    async def finish(self):
+        await self.drain()
+        if self.reply_bytes:
+            self._send(json.dumps({"type": "reply.done"}))
+        self.reply_bytes = 0
+
+    def reset(self):
+        self.flush()
+        self.reply_bytes = 0
+
+    def close(self):
+        if self.dropped_bytes:
+            logging.warning(f"Caller too slow, dropped {self.dropped_bytes} bytes of reply audio")
+
+class CallerSession:
+    def __init__(self, websocket, client):
+        self.websocket = websocket
+        self.client = client
+        self.mic = CallerMicrophone()
+        self.player = CallerPlayer(websocket)
+        self.barge_in = BargeInController(client, self.player)
+        self.vad_gate = VADGate() if LOCAL_VAD else None
+
+    async def _read_caller(self):
+        async for message in self.websocket:
+            if isinstance(message, bytes):
+                self.mic.write(message)
+                continue
+            try:
+                control = json.loads(message)
+            except ValueError:
+                logging.warning(f"Ignoring malformed control message from caller: {message[:80]!r}")
+                continue
+            if isinstance(control, dict) and control.get("type") == "hangup":
+                return
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self._read_caller()),
+            asyncio.create_task(self.player.sender()),
+            asyncio.create_task(process_ws_messages(self.client, self.mic, self.player, self.barge_in)),
+            asyncio.create_task(stream_microphone(self.client, self.mic, self.vad_gate, self.barge_in)),
+        ]
+        self.mic.start_recording()
+        await self.websocket.send(json.dumps({"type": "ready"}))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() and not isinstance(task.exception(), ConnectionClosed):
+                    logging.error(f"Caller session failed: {task.exception()!r}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.mic.close()
+            self.player.close()
+            logging.info(f"📊 Caller session: {self.client.metrics()}")
+            await self.client.close()
+
+class ConversationServer:
+    def __init__(self, max_sessions=SERVER_MAX_SESSIONS, pool_size=0, **client_kwargs):
+        self.max_sessions = max_sessions
+        self.pool = RealtimeSessionPool(SESSION_INSTRUCTIONS, tools, size=pool_size, **client_kwargs) if pool_size else None
+        self.client_kwargs = client_kwargs
+        self.sessions = set()
+        self.opening = 0  # callers holding a slot while their realtime session connects
+        self.total_sessions = 0
+        self.rejected = 0
+        self.server = None
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        if self.pool:
+            await self.pool.start()
+        self.server = await websockets.serve(self._handle, host, port, max_size=CALLER_MAX_MESSAGE_BYTES)
+        logging.info(f"🎧 Conversation server listening on ws://{host}:{port} (max {self.max_sessions} sessions)")
+        return self
+
+    async def _open_client(self):
+        if self.pool:
+            return await self.pool.acquire()
+        client = OpenAIRealtimeClient(SESSION_INSTRUCTIONS, tools, **self.client_kwargs)
+        await client.connect()
+        return client
+
+    async def _handle(self, websocket, *args):
+        if len(self.sessions) + self.opening >= self.max_sessions:
+            self.rejected += 1
+            await websocket.close(1013, "Server at capacity")
+            return
+        self.opening += 1
+        try:
+            client = await self._open_client()
+        except Exception as e:
+            logging.error(f"Could not open a realtime session for a caller: {e}")
+            await websocket.close(1011, "Realtime API unavailable")
+            return
+        finally:
+            self.opening -= 1
+        session = CallerSession(websocket, client)
+        self.sessions.add(session)
+        self.total_sessions += 1
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+
+    def metrics(self):
+        return {
+            "active_sessions": len(self.sessions),
+            "opening_sessions": self.opening,
+            "max_sessions": self.max_sessions,
+            "total_sessions": self.total_sessions,
+            "rejected": self.rejected,
+            "pool": self.pool.metrics() if self.pool else None,
+            "session_clients": [session.client.metrics() for session in self.sessions],
+        }
+
+    async def log_metrics(self, interval=SERVER_METRICS_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            # Per-session client metrics are in /metrics; they'd swamp the log
+            summary = {key: value for key, value in self.metrics().items() if key != "session_clients"}
+            logging.info(f"📊 Server: {summary}")
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        if self.pool:
+            await self.pool.close()
+        registry.shutdown()
+
+async def serve(args):
+    server = await ConversationServer(args.max_sessions, args.pool_size).start(args.host, args.port)
+    try:
+        await server.log_metrics()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-sessions", type=int, default=SERVER_MAX_SESSIONS)
+    parser.add_argument("--pool-size", type=int, default=0, help="pre-warmed realtime sessions")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        logging.info("Server stopped")
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import time
+from openai_client import OpenAIRealtimeClient
+
+# Warm sessions kept connected and configured, ready for the next caller
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+SESSION_POOL_MAX_AGE = float(os.getenv("SESSION_POOL_MAX_AGE", "300"))
+SESSION_POOL_CHECK_INTERVAL = 15.0
+SESSION_POOL_PING_TIMEOUT = 5.0
+# How long connecting and configuring one session may take before it is abandoned
+SESSION_POOL_WARM_TIMEOUT = float(os.getenv("SESSION_POOL_WARM_TIMEOUT", "10"))
+
+class PooledSession:
+    __slots__ = ("client", "created_at")
+
+    def __init__(self, client):
+        self.client = client
+        self.created_at = time.monotonic()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+class RealtimeSessionPool:
+    """Keeps `size` realtime sessions connected and configured ahead of demand.
+
+    Each warm session has finished the TLS handshake, the WebSocket upgrade and
+    the session.update round trip, so acquire() returns a client the caller can
+    stream audio into immediately. Sessions carry conversation state and are
+    handed out once; the caller closes them when done. Idle sessions are pinged
+    every check interval and retired once they reach max_age.
+    """
+
+    def __init__(self, session_instructions, tools, size=SESSION_POOL_SIZE, max_age=SESSION_POOL_MAX_AGE,
+                 check_interval=SESSION_POOL_CHECK_INTERVAL, warm_timeout=SESSION_POOL_WARM_TIMEOUT, **client_kwargs):
+        self.session_instructions = session_instructions
+        self.tools = tools
+        self.size = size
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.warm_timeout = warm_timeout
+        self.client_kwargs = client_kwargs
+        self.idle = asyncio.Queue()
+        self.warming = 0
+        self.maintenance_task = None
+        self.refill_tasks = set()
+        self.hits = 0
+        self.misses = 0
+        self.retired = 0
+
+    async def start(self):
+        await asyncio.gather(*(self._add_session() for _ in range(self.size)))
+        self.maintenance_task = asyncio.create_task(self._maintain())
+        logging.info(f"Session pool started with {self.idle.qsize()} warm sessions")
+
+    async def _open_session(self):
+        client = OpenAIRealtimeClient(self.session_instructions, self.tools, **self.client_kwargs)
+        try:
+            await asyncio.wait_for(self._configure(client), self.warm_timeout)
+        except BaseException:
+            # Don't leak the socket, writer task and loop lag monitor of a half-open session
+            await client.close()
+            raise
+        return client
+
+    async def _configure(self, client):
+        await client.connect()
+        # Consume the setup events so the caller starts on a configured, quiet session
+        while True:
+            event = await client.receive_event()
+            if event["type"] == "session.updated":
+                return
+            if event["type"] == "error":
+                raise RuntimeError(f"session.update rejected: {event.get('error', {}).get('message', event)}")
+
+    async def _add_session(self):
+        self.warming += 1
+        try:
+            client = await self._open_session()
+        except Exception as e:
+            logging.warning(f"Failed to warm a realtime session: {e!r}")
+            return
+        finally:
+            self.warming -= 1
+        self.idle.put_nowait(PooledSession(client))
+
+    def _refill(self):
+        missing = self.size - self.idle.qsize() - self.warming
+        for _ in range(missing):
+            task = asyncio.create_task(self._add_session())
+            self.refill_tasks.add(task)
+            task.add_done_callback(self.refill_tasks.discard)
+
+    async def acquire(self):
+        """Returns a ready client, falling back to a fresh connection if the pool is empty."""
+        try:
+            while True:
+                session = self.idle.get_nowait()
+                if session.age < self.max_age:
+                    self.hits += 1
+                    return session.client
+                await self._retire(session)
+        except asyncio.QueueEmpty:
+            self.misses += 1
+            return await self._open_session()
+        finally:
+            self._refill()
+
+    async def _retire(self, session):
+        self.retired += 1
+        await session.client.close()
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for _ in range(self.idle.qsize()):
+                session = self.idle.get_nowait()
+                if session.age >= self.max_age:
+                    await self._retire(session)
+                    continue
+                try:
+                    await session.client.ping(SESSION_POOL_PING_TIMEOUT)
+                except Exception as e:
+                    logging.warning(f"Dropping unhealthy pooled session: {e}")
+                    await self._retire(session)
+                    continue
+                self.idle.put_nowait(session)
+            self._refill()
+
+    def metrics(self):
+        return {
+            "idle": self.idle.qsize(),
+            "warming": self.warming,
+            "hits": self.hits,
+            "misses": self.misses,
+            "retired": self.retired,
+        }
+
+    async def close(self):
+        if self.maintenance_task:
+            self.maintenance_task.cancel()
+        for task in list(self.refill_tasks):
+            task.cancel()
+        while not self.idle.empty():
+            await self.idle.get_nowait().client.close()
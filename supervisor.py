@@ -0,0 +1,188 @@
+"""Shards caller sessions across worker processes, one event loop and core each.
+
+Every worker runs a ConversationServer (see server.py) on its own port and
+imports the tool registry itself. Callers connect to the supervisor's port.
+The handshake is answered with a redirect to the worker with the fewest
+active sessions, and WebSocket clients follow it, so the supervisor never
+touches audio. Workers report their metrics once a second. GET /metrics on
+the supervisor port returns the aggregate as JSON.
+
+    python supervisor.py [--workers 4] [--port 8766]
+"""
+import os
+import json
+import time
+import queue
+import signal
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from http import HTTPStatus
+import websockets
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPERVISOR_WORKERS = int(os.getenv("SUPERVISOR_WORKERS", "0")) or os.cpu_count()
+SUPERVISOR_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SUPERVISOR_PORT = int(os.getenv("SERVER_PORT", "8766"))
+WORKER_METRICS_INTERVAL = 1.0
+SUPERVISOR_METRICS_INTERVAL = 30.0
+
+def run_worker(index, host, port, max_sessions, pool_size, metrics_queue):
+    """Process entry point; imports the server (and with it the tool registry) in the worker."""
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s - worker {index} - %(message)s")
+    if hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[index % len(cores)]})
+    try:
+        asyncio.run(_serve_worker(index, host, port, max_sessions, pool_size, metrics_queue))
+    except KeyboardInterrupt:
+        pass
+
+async def _serve_worker(index, host, port, max_sessions, pool_size, metrics_queue):
+    from server import ConversationServer, SERVER_MAX_SESSIONS
+    server = await ConversationServer(max_sessions or SERVER_MAX_SESSIONS, pool_size).start(host, port)
+    while True:
+        metrics_queue.put((index, server.metrics()))
+        await asyncio.sleep(WORKER_METRICS_INTERVAL)
+
+class Worker:
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.process = None
+        self.metrics = {}
+        self.assigned = 0  # sessions routed here since its last metrics report
+        self.restarts = 0
+
+    @property
+    def load(self):
+        return self.metrics.get("active_sessions", 0) + self.assigned
+
+class Supervisor:
+    def __init__(self, workers=SUPERVISOR_WORKERS, max_sessions_per_worker=None, pool_size=0):
+        self.worker_count = workers
+        self.max_sessions = max_sessions_per_worker  # None: the workers' SERVER_MAX_SESSIONS
+        self.pool_size = pool_size
+        self.context = multiprocessing.get_context("spawn")
+        self.metrics_queue = self.context.Queue()
+        self.workers = []
+        self.host = None
+        self.server = None
+        self.tasks = []
+        self.routed = 0
+        self.rejected = 0
+
+    async def start(self, host=SUPERVISOR_HOST, port=SUPERVISOR_PORT):
+        self.host = host
+        # Workers listen on the ports right after the supervisor's
+        self.workers = [Worker(i, port + 1 + i) for i in range(self.worker_count)]
+        for worker in self.workers:
+            self._spawn(worker)
+        self.server = await websockets.serve(self._handle, host, port, process_request=self._route)
+        self.tasks = [asyncio.create_task(self._collect_metrics()), asyncio.create_task(self._monitor())]
+        logging.info(f"🧭 Supervisor on ws://{host}:{port} routing to {self.worker_count} workers")
+        return self
+
+    def _spawn(self, worker):
+        worker.process = self.context.Process(
+            target=run_worker,
+            args=(worker.index, self.host, worker.port, self.max_sessions, self.pool_size, self.metrics_queue),
+            daemon=True,
+        )
+        worker.process.start()
+        worker.metrics = {}
+        worker.assigned = 0
+
+    async def _route(self, path, headers):
+        if path == "/metrics":
+            return HTTPStatus.OK, [("Content-Type", "application/json")], json.dumps(self.metrics()).encode()
+        # Only workers that have reported in are listening
+        ready = [w for w in self.workers if w.metrics and w.process.is_alive()
+                 and w.load < w.metrics["max_sessions"]]
+        if not ready:
+            self.rejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, [], b"No worker available\n"
+        worker = min(ready, key=lambda w: w.load)
+        worker.assigned += 1
+        self.routed += 1
+        hostname = headers.get("Host", self.host).rsplit(":", 1)[0]
+        return HTTPStatus.TEMPORARY_REDIRECT, [("Location", f"ws://{hostname}:{worker.port}{path}")], b""
+
+    async def _handle(self, websocket, *args):
+        # Every handshake is answered by _route, nothing gets this far
+        await websocket.close()
+
+    async def _collect_metrics(self):
+        while True:
+            try:
+                index, metrics = await asyncio.to_thread(self.metrics_queue.get, True, WORKER_METRICS_INTERVAL)
+            except queue.Empty:
+                continue
+            worker = self.workers[index]
+            worker.metrics = metrics
+            worker.assigned = 0
+
+    async def _monitor(self):
+        last_log = time.monotonic()
+        while True:
+            await asyncio.sleep(WORKER_METRICS_INTERVAL)
+            for worker in self.workers:
+                if not worker.process.is_alive():
+                    worker.restarts += 1
+                    logging.warning(f"Worker {worker.index} exited with {worker.process.exitcode}, restarting")
+                    self._spawn(worker)
+            if time.monotonic() - last_log >= SUPERVISOR_METRICS_INTERVAL:
+                last_log = time.monotonic()
+                summary = self.metrics()
+                for worker in summary["workers"]:
+                    worker.pop("session_clients", None)
+                logging.info(f"📊 Supervisor: {summary}")
+
+    def metrics(self):
+        totals = {"active_sessions": 0, "total_sessions": 0, "rejected": self.rejected}
+        for worker in self.workers:
+            for key in ("active_sessions", "total_sessions", "rejected"):
+                totals[key] += worker.metrics.get(key, 0)
+        totals["routed"] = self.routed
+        totals["workers"] = [
+            {"index": w.index, "port": w.port, "pid": w.process.pid, "alive": w.process.is_alive(),
+             "restarts": w.restarts, **w.metrics}
+            for w in self.workers
+        ]
+        return totals
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+        for worker in self.workers:
+            worker.process.terminate()
+        for worker in self.workers:
+            worker.process.join()
+
+async def supervise(args):
+    supervisor = await Supervisor(args.workers, args.max_sessions, args.pool_size).start(args.host, args.port)
+    stopped = asyncio.Event()
+    # Take the workers down with us on SIGTERM too
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await supervisor.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - supervisor - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=SUPERVISOR_WORKERS)
+    parser.add_argument("--host", default=SUPERVISOR_HOST)
+    parser.add_argument("--port", type=int, default=SUPERVISOR_PORT)
+    parser.add_argument("--max-sessions", type=int, help="per worker")
+    parser.add_argument("--pool-size", type=int, default=0, help="pre-warmed realtime sessions per worker")
+    try:
+        asyncio.run(supervise(parser.parse_args()))
+    except KeyboardInterrupt:
+        logging.info("Supervisor stopped")
@@ -0,0 +1,21 @@
+import os
+import json
+import base64
+import pytest
+from codec_executor import CODEC_OFFLOAD_BYTES
+from event_decoder import decode_event
+
+def audio_delta(b64):
+    return json.dumps({"type": "response.audio.delta", "response_id": "resp_1", "item_id": "item_1", "delta": b64})
+
+@pytest.mark.parametrize("size", [3000, CODEC_OFFLOAD_BYTES])
+def test_escaped_slashes_in_a_delta_are_unescaped(size):
+    audio = os.urandom(size)
+    b64 = base64.b64encode(audio).decode("ascii")
+    assert "/" in b64
+    event = decode_event(audio_delta(b64).replace("/", "\\/"))
+    assert event.get("delta") == b64 or event.get("audio") == audio
+
+def test_truncated_frame_raises_a_decode_error():
+    with pytest.raises(ValueError):
+        decode_event('{"type": "response.audio.delta", "delta": ')
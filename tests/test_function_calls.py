@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from agent_tools import function_map
+from workflow import ConversationHandlers
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send_event(self, event):
+        self.sent.append(event)
+
+class FakeMic:
+    def __init__(self, full_duplex=False):
+        self.full_duplex = full_duplex
+
+    def start_receiving(self):
+        pass
+
+    def stop_receiving(self):
+        pass
+
+    def start_recording(self):
+        pass
+
+class FakePlayer:
+    """Like AudioPlayer, finish() yields while the reply plays out."""
+
+    async def finish(self):
+        await asyncio.sleep(0.01)
+
+class FakeBargeIn:
+    def on_response_created(self):
+        pass
+
+    def on_response_done(self):
+        pass
+
+async def echo(function_name, delay=0, **kwargs):
+    await asyncio.sleep(delay)
+    return kwargs
+
+@pytest.fixture(autouse=True)
+def echo_tool(monkeypatch):
+    monkeypatch.setitem(function_map, "echo", echo)
+
+async def tool_response(handlers, arguments='{"x": 1}', call_id="call_1"):
+    await handlers.on_response_created({})
+    await handlers.on_output_item_added({"item": {"type": "function_call", "name": "echo", "call_id": call_id}})
+    await handlers.on_function_call_arguments_done({"call_id": call_id, "arguments": arguments})
+    await handlers.on_response_done({"response": {"status": "completed"}})
+
+async def flushed(handlers):
+    while handlers.function_call_flushes:
+        await asyncio.gather(*handlers.function_call_flushes)
+
+@pytest.mark.parametrize("full_duplex", [False, True])
+def test_tool_outputs_are_followed_by_response_create(full_duplex):
+    async def scenario():
+        client = FakeClient()
+        handlers = ConversationHandlers(client, FakeMic(full_duplex), FakePlayer(), FakeBargeIn())
+        await tool_response(handlers)
+        await flushed(handlers)
+        return client
+
+    sent = asyncio.run(scenario()).sent
+    assert [event["type"] for event in sent] == ["conversation.item.create", "response.create"]
+    assert sent[0]["item"]["call_id"] == "call_1"
+
+def test_follow_up_waits_for_a_response_the_user_started():
+    async def scenario():
+        client = FakeClient()
+        handlers = ConversationHandlers(client, FakeMic(), FakePlayer(), FakeBargeIn())
+        await tool_response(handlers, '{"x": 1, "delay": 0.05}')
+        # The user spoke before the tool output went out
+        await handlers.on_response_created({})
+        await flushed(handlers)
+        assert [event["type"] for event in client.sent] == ["conversation.item.create"]
+        await handlers.on_response_done({"response": {"status": "completed"}})
+        return client
+
+    sent = asyncio.run(scenario()).sent
+    assert [event["type"] for event in sent] == ["conversation.item.create", "response.create"]
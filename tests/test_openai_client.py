@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+from openai_client import OpenAIRealtimeClient
+from send_queue import PRIORITY_AUDIO
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return OpenAIRealtimeClient("", [])
+
+def test_outage_audio_replays_after_audio_queued_before_the_drop(client):
+    async def scenario():
+        client.connected.set()
+        for frame in ("a1", "a2", "a3"):
+            client.send_queue.put_audio(frame)
+        client._connection_lost(ConnectionError("dropped"))
+        client.reconnect_task.cancel()
+        for frame in ("b1", "b2"):
+            client._buffer_outage_audio(frame)
+        client._replay_outage_audio()
+        return [message for message, _ in client.send_queue.take_audio()]
+
+    assert asyncio.run(scenario()) == ["a1", "a2", "a3", "b1", "b2"]
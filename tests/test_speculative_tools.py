@@ -0,0 +1,129 @@
+import json
+import asyncio
+import pytest
+from tools import BaseTool
+from agent_tools import function_map, registry
+import workflow
+from workflow import ConversationHandlers
+
+class LookupTool(BaseTool):
+    """Read-only tool that blocks until released, recording every start and cancellation."""
+
+    name = "lookup"
+    description = "Looks something up."
+    parameters = {
+        "type": "object",
+        "properties": {"q": {"type": "string"}, "limit": {"type": "integer"}},
+        "required": ["q"],
+    }
+    speculative = True
+    max_concurrency = 1
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+        self.release = None
+
+    async def execute(self, q, limit=10):
+        self.started.append({"q": q, "limit": limit})
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append({"q": q, "limit": limit})
+            raise
+        return {"q": q, "limit": limit}
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send_event(self, event):
+        self.sent.append(event)
+
+@pytest.fixture
+def lookup(monkeypatch):
+    tool = LookupTool()
+    monkeypatch.setitem(registry.tools, tool.name, tool)
+    monkeypatch.setitem(registry.locations, tool.name, (__name__, "LookupTool"))
+    monkeypatch.setitem(function_map, tool.name, registry.execute)
+    # Keep the saved-time metric out of the working directory
+    monkeypatch.setattr(workflow, "log_runtime", lambda name, duration: None)
+    yield tool
+    registry.semaphores.pop(tool.name, None)
+
+async def stream_call(handlers, deltas, call_id="call_1"):
+    await handlers.on_output_item_added({"item": {"type": "function_call", "name": "lookup", "call_id": call_id}})
+    for delta in deltas:
+        await handlers.on_function_call_arguments_delta({"call_id": call_id, "delta": delta})
+        await asyncio.sleep(0)  # let a speculative call start
+    await asyncio.sleep(0)
+
+def test_speculation_hit_reuses_the_running_call(lookup):
+    async def scenario():
+        lookup.release = asyncio.Event()
+        client = FakeClient()
+        handlers = ConversationHandlers(client, None, None, None)
+        await stream_call(handlers, ['{"q": ', '"weather"'])
+        # Started once the required argument was complete, before the arguments are done
+        assert lookup.started == [{"q": "weather", "limit": 10}]
+        await handlers.on_function_call_arguments_done({"call_id": "call_1", "arguments": '{"q": "weather"}'})
+        lookup.release.set()
+        await handlers.send_function_call_outputs()
+        return client, handlers
+
+    client, handlers = asyncio.run(scenario())
+    assert lookup.started == [{"q": "weather", "limit": 10}]
+    assert (handlers.speculation_hits, handlers.speculation_misses) == (1, 0)
+    output = client.sent[0]["item"]
+    assert output["call_id"] == "call_1"
+    assert json.loads(output["output"]) == {"q": "weather", "limit": 10}
+    assert client.sent[-1] == {"type": "response.create"}
+
+def test_speculation_restarts_when_a_later_member_changes_the_arguments(lookup):
+    async def scenario():
+        lookup.release = asyncio.Event()
+        client = FakeClient()
+        handlers = ConversationHandlers(client, None, None, None)
+        await stream_call(handlers, ['{"q": "weather"', ', "limit": 3', '}'])
+        await handlers.on_function_call_arguments_done({"call_id": "call_1", "arguments": '{"q": "weather", "limit": 3}'})
+        lookup.release.set()
+        await handlers.send_function_call_outputs()
+        return client, handlers
+
+    client, handlers = asyncio.run(scenario())
+    assert lookup.started == [{"q": "weather", "limit": 10}, {"q": "weather", "limit": 3}]
+    assert lookup.cancelled == [{"q": "weather", "limit": 10}]
+    assert (handlers.speculation_hits, handlers.speculation_misses) == (1, 1)
+    assert json.loads(client.sent[0]["item"]["output"]) == {"q": "weather", "limit": 3}
+
+def test_cancelled_speculation_frees_its_concurrency_slot(lookup):
+    async def scenario():
+        lookup.release = asyncio.Event()
+        handlers = ConversationHandlers(FakeClient(), None, None, None)
+        await stream_call(handlers, ['{"q": "weather"'])
+        assert registry.semaphores["lookup"].locked()
+        speculation = handlers.function_calls["call_1"]["speculation"]["task"]
+        # What on_response_done does when the response was cancelled
+        handlers.cancel_function_calls()
+        with pytest.raises(asyncio.CancelledError):
+            await speculation
+        assert lookup.cancelled == [{"q": "weather", "limit": 10}]
+        assert not registry.semaphores["lookup"].locked()
+        # max_concurrency is 1, so this only runs if the cancelled call gave its slot back
+        lookup.release.set()
+        return await asyncio.wait_for(registry.execute("lookup", q="news"), 1)
+
+    assert asyncio.run(scenario()) == {"q": "news", "limit": 10}
+
+def test_thread_tools_are_not_speculated(lookup, monkeypatch):
+    monkeypatch.setattr(lookup, "execution_mode", "thread")
+
+    async def scenario():
+        lookup.release = asyncio.Event()
+        handlers = ConversationHandlers(FakeClient(), None, None, None)
+        await stream_call(handlers, ['{"q": "weather"'])
+        return handlers
+
+    handlers = asyncio.run(scenario())
+    assert lookup.started == []
+    assert handlers.function_calls["call_1"]["speculation"] is None
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import pytest
+from tools import BaseTool, ToolRegistry
+
+class BlockingTool(BaseTool):
+    """Thread tool that blocks its worker thread until released."""
+
+    name = "blocking"
+    description = "Blocks until released."
+    parameters = {"type": "object", "properties": {}}
+    execution_mode = "thread"
+    timeout = 0.1
+    max_concurrency = 1
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    async def execute(self):
+        self.release.wait()
+        return {"status": "done"}
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry()
+    tool = BlockingTool()
+    registry.register(tool)
+    yield registry, tool
+    tool.release.set()
+    registry.shutdown()
+
+def test_call_queued_behind_a_hung_thread_times_out(registry):
+    registry, tool = registry
+
+    async def scenario():
+        hung = await registry.execute("blocking")
+        # The hung thread keeps the only slot, and waiting for it counts against the timeout
+        queued = await asyncio.wait_for(registry.execute("blocking"), 1)
+        tool.release.set()
+        await asyncio.sleep(0.05)
+        return hung, queued, await registry.execute("blocking")
+
+    hung, queued, after = asyncio.run(scenario())
+    assert hung["type"] == "timeout"
+    assert queued["type"] == "timeout"
+    assert after == {"status": "done"}
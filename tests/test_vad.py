@@ -0,0 +1,37 @@
+import wave
+import numpy as np
+from audio_format import RATE, BYTES_PER_FRAME
+from vad import VADGate, gate_wav
+
+def ms_to_bytes(ms):
+    return RATE * ms // 1000 * BYTES_PER_FRAME
+
+def write_fixture(path, tone_dbfs, silence_ms=1000, tone_ms=1000):
+    """silence -> 440 Hz tone -> silence, as 16-bit mono PCM at RATE."""
+    t = np.arange(RATE * tone_ms // 1000) / RATE
+    tone = np.sin(2 * np.pi * 440 * t) * 32767 * 10 ** (tone_dbfs / 20)
+    silence = np.zeros(RATE * silence_ms // 1000)
+    pcm = np.concatenate([silence, tone, silence]).astype(np.int16).tobytes()
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(pcm)
+    return pcm
+
+def test_gate_keeps_tone_with_preroll_and_hangover(tmp_path):
+    path = tmp_path / "tone.wav"
+    pcm = write_fixture(path, tone_dbfs=-20)
+    kept, gate = gate_wav(str(path), VADGate(preroll_ms=300, hangover_ms=600))
+    # Speech runs 1000-2000ms, padded by 300ms of pre-roll and 600ms of hangover
+    assert kept == pcm[ms_to_bytes(700):ms_to_bytes(2600)]
+    assert gate.frames_sent == (2600 - 700) // 20
+    assert gate.frames_in == 3000 // 20
+    assert not gate.in_speech
+
+def test_gate_drops_tone_below_threshold(tmp_path):
+    path = tmp_path / "quiet.wav"
+    write_fixture(path, tone_dbfs=-60)
+    kept, gate = gate_wav(str(path), VADGate(preroll_ms=300, hangover_ms=600))
+    assert kept == b""
+    assert gate.frames_sent == 0
@@ -1,47 +1,238 @@
 import os
+import json
+import asyncio
 import importlib
 import logging
-from typing import List, Dict, Any
+import multiprocessing
+import concurrent.futures
+from typing import List, Dict, Any, Optional, Tuple
 from .base_tool import BaseTool
 
-def load_tools() -> List[Dict[str, Any]]:
-    tools = []
-    tools_dir = os.path.dirname(__file__)
-    
-    for filename in os.listdir(tools_dir):
+TOOLS_DIR = os.path.dirname(__file__)
+# Schemas of every tool module, keyed by source mtime and size, so startup needn't import them
+TOOL_MANIFEST_FILE = os.getenv("TOOL_MANIFEST_FILE", os.path.join(TOOLS_DIR, ".tool_manifest.json"))
+MANIFEST_VERSION = 1
+# Thread pool size for "thread" tools, and how many "process" tool calls may run at once
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "4"))
+TOOL_PROCESSES = int(os.getenv("TOOL_PROCESSES", "2"))
+
+def _tool_modules():
+    for filename in sorted(os.listdir(TOOLS_DIR)):
         if filename.endswith('.py') and filename != '__init__.py' and filename != 'base_tool.py':
-            module_name = filename[:-3]  # Remove .py extension
+            yield filename[:-3], os.path.join(TOOLS_DIR, filename)  # Remove .py extension
+
+def _read_manifest(path) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get("modules", {}) if manifest.get("version") == MANIFEST_VERSION else {}
+
+def _write_manifest(path, modules):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "modules": modules}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write the tool manifest {path}: {e}")
+
+def _run_tool(tool: BaseTool, kwargs: Dict[str, Any]):
+    """Runs a tool's execute() to completion on a pool thread, with a loop of its own."""
+    return asyncio.run(tool.execute(**kwargs))
+
+def _run_tool_in_process(connection, module_name: str, class_name: str, kwargs: Dict[str, Any]):
+    """Imports and runs a tool in its own process, so the tool itself never has to be pickled."""
+    try:
+        module = importlib.import_module(f'.{module_name}', package='tools')
+        connection.send((True, asyncio.run(getattr(module, class_name)().execute(**kwargs))))
+    except Exception as e:
+        # Sent as text since the exception itself may not pickle
+        connection.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+def _release_from_thread(loop: asyncio.AbstractEventLoop, semaphore: asyncio.Semaphore):
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:
+        pass  # The loop closed while the thread was still running
+
+class ToolRegistry:
+    """Every tool, indexed by name and instantiated once on first use.
+
+    Schemas for session.update come from a manifest cached next to the tool
+    modules, so startup imports only modules whose source changed since the
+    manifest was written; the rest are imported on their first call.
+    Dispatching a function call is a single dict lookup. Each call runs
+    where the tool's execution_mode says and is stopped after its timeout.
+    A "process" call runs in a process of its own, which is killed. A
+    "thread" call can't be stopped once it has started, so it keeps its
+    max_concurrency slot until the thread returns and its result is dropped;
+    for the same reason thread tools are never run speculatively.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, BaseTool] = {}
+        self.locations: Dict[str, Tuple[str, str]] = {}  # name -> (module, class)
+        self.schemas: List[Dict[str, Any]] = []
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.thread_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.process_slots = asyncio.Semaphore(TOOL_PROCESSES)
+        self.processes = set()
+
+    def register(self, tool: BaseTool):
+        entry = self._add(tool.__class__.__module__.rsplit(".", 1)[-1], tool.__class__.__name__, {
+            "type": "function",
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.parameters,
+        })
+        self.tools[tool.name] = tool
+        return entry
+
+    def _add(self, module_name: str, class_name: str, schema: Dict[str, Any]):
+        if schema["name"] in self.locations:
+            raise ValueError(f"Duplicate tool name '{schema['name']}'")
+        self.locations[schema["name"]] = (module_name, class_name)
+        self.schemas.append(schema)
+        return dict(schema, **{"class": class_name})
+
+    @classmethod
+    def discover(cls, manifest_path: Optional[str] = TOOL_MANIFEST_FILE) -> "ToolRegistry":
+        """Registers every BaseTool subclass in the tools package, from the manifest where it is current."""
+        registry = cls()
+        cached = _read_manifest(manifest_path) if manifest_path else {}
+        modules = {}
+        imported = []
+        for module_name, path in _tool_modules():
+            stat = os.stat(path)
+            entry = cached.get(module_name)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                for tool in entry["tools"]:
+                    schema = {key: value for key, value in tool.items() if key != "class"}
+                    registry._add(module_name, tool["class"], schema)
+            else:
+                module = importlib.import_module(f'.{module_name}', package='tools')
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "tools": []}
+                for attr in vars(module).values():
+                    if isinstance(attr, type) and issubclass(attr, BaseTool) and attr is not BaseTool \
+                            and attr.__module__ == module.__name__:
+                        entry["tools"].append(registry.register(attr()))
+                imported.append(module_name)
+            modules[module_name] = entry
+        if manifest_path and (imported or modules.keys() != cached.keys()):
+            _write_manifest(manifest_path, modules)
+        logging.info(f"Loaded tools: {list(registry.locations)} (imported {imported or 'none'} at startup)")
+        return registry
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self.locations
+
+    def get(self, tool_name: str) -> BaseTool:
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            if tool_name not in self.locations:
+                raise ValueError(f"Tool '{tool_name}' not found")
+            module_name, class_name = self.locations[tool_name]
             module = importlib.import_module(f'.{module_name}', package='tools')
-            
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, type) and issubclass(attr, BaseTool) and attr != BaseTool:
-                    tool_instance = attr()
-                    tools.append({
-                        "type": "function",
-                        "name": tool_instance.name,
-                        "description": tool_instance.description,
-                        "parameters": tool_instance.parameters
-                    })
-    
-    logging.info(f"Loaded tools: {[tool['name'] for tool in tools]}")
-    return tools
+            tool = self.tools[tool_name] = getattr(module, class_name)()
+        return tool
+
+    def _call(self, tool_name: str, tool: BaseTool, kwargs: Dict[str, Any]):
+        if tool.execution_mode == "async":
+            return tool.execute(**kwargs)
+        if tool.execution_mode == "thread":
+            if self.thread_pool is None:
+                self.thread_pool = concurrent.futures.ThreadPoolExecutor(TOOL_THREADS, thread_name_prefix="tool")
+            return self.thread_pool.submit(_run_tool, tool, kwargs)
+        if tool.execution_mode == "process":
+            return self._run_in_process(tool_name, kwargs)
+        raise ValueError(f"Tool '{tool_name}' has unknown execution_mode '{tool.execution_mode}'")
+
+    async def _run_in_process(self, tool_name: str, kwargs: Dict[str, Any]):
+        module_name, class_name = self.locations[tool_name]
+        loop = asyncio.get_running_loop()
+        # Spawned rather than forked: the parent has an event loop and pool threads running
+        context = multiprocessing.get_context("spawn")
+        reader, writer = context.Pipe(duplex=False)
+        async with self.process_slots:
+            process = context.Process(target=_run_tool_in_process, args=(writer, module_name, class_name, kwargs),
+                                      name=f"tool-{tool_name}", daemon=True)
+            process.start()
+            writer.close()
+            self.processes.add(process)
+            readable = loop.create_future()
+            loop.add_reader(reader.fileno(), lambda: readable.done() or readable.set_result(None))
+            try:
+                await readable
+                try:
+                    ok, result = reader.recv()
+                except EOFError:
+                    ok, result = False, "the tool process exited without a result"
+            finally:
+                loop.remove_reader(reader.fileno())
+                reader.close()
+                # Stops a timed out or cancelled call; a finished one has nothing left to do
+                process.kill()
+                process.join()
+                self.processes.discard(process)
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    async def execute(self, tool_name: str, **kwargs):
+        tool = self.get(tool_name)
+        semaphore = self.semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = self.semaphores[tool_name] = asyncio.Semaphore(tool.max_concurrency)
+        acquired = False
+        work = None
+        try:
+            # Waiting for a slot counts against the timeout too, or calls queued behind hung ones never return
+            async with asyncio.timeout(tool.timeout):
+                await semaphore.acquire()
+                acquired = True
+                work = self._call(tool_name, tool, kwargs)
+                if isinstance(work, concurrent.futures.Future):
+                    # Shielded so a timeout leaves the future running
+                    return await asyncio.shield(asyncio.wrap_future(work))
+                return await work
+        except TimeoutError:
+            logging.warning(f"⏱️ Tool {tool_name} timed out after {tool.timeout}s")
+            return {"error": f"Tool '{tool_name}' timed out after {tool.timeout} seconds", "type": "timeout"}
+        finally:
+            if acquired:
+                self._release(semaphore, work)
+
+    @staticmethod
+    def _release(semaphore: asyncio.Semaphore, work):
+        if isinstance(work, concurrent.futures.Future) and not work.cancel() and not work.done():
+            # Released when the thread returns
+            loop = asyncio.get_running_loop()
+            work.add_done_callback(lambda future: _release_from_thread(loop, semaphore))
+        else:
+            semaphore.release()
+
+    def shutdown(self):
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False, cancel_futures=True)
+            self.thread_pool = None
+        for process in list(self.processes):
+            process.kill()
+
+_registry: Optional[ToolRegistry] = None
+
+def get_registry() -> ToolRegistry:
+    """The process-wide registry, discovered on first use."""
+    global _registry
+    if _registry is None:
+        _registry = ToolRegistry.discover()
+    return _registry
+
+def load_tools() -> List[Dict[str, Any]]:
+    return get_registry().schemas
 
 async def execute_tool(tool_name: str, **kwargs):
-    tools_dir = os.path.dirname(__file__)
-    
-    for filename in os.listdir(tools_dir):
-        if filename.endswith('.py') and filename != '__init__.py' and filename != 'base_tool.py':
-            module_name = filename[:-3]
-            module = importlib.import_module(f'.{module_name}', package='tools')
-            
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, type) and issubclass(attr, BaseTool) and attr != BaseTool:
-                    tool_instance = attr()
-                    if tool_instance.name == tool_name:
-                        print(f"Executing tool: {tool_name} with args: {kwargs}")  # Enhanced debugging
-                        return await tool_instance.execute(**kwargs)
-    
-    print(f"Tool '{tool_name}' not found")  # Add this line for debugging
-    raise ValueError(f"Tool '{tool_name}' not found")
+    return await get_registry().execute(tool_name, **kwargs)
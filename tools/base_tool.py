@@ -1,7 +1,21 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# Seconds a tool may run before the model is told it timed out, unless the tool sets its own
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
 
 class BaseTool(ABC):
+    # Where execute() runs: "async" on the event loop, "thread" in the tool thread pool for
+    # tools that block, or "process" in the tool process pool for CPU-bound or untrusted work
+    execution_mode: str = "async"
+    timeout: Optional[float] = TOOL_TIMEOUT_SECONDS
+    # How many calls of this tool may run at once, across all sessions in the process
+    max_concurrency: int = 4
+    # Opt-in for idempotent, read-only tools: start the call as soon as the required arguments
+    # have streamed in, and cancel it if the final arguments differ. Ignored for "thread" tools
+    speculative: bool = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -3,6 +3,9 @@ from typing import Dict, Any
 from .base_tool import BaseTool
 
 class OpenBrowserTool(BaseTool):
+    execution_mode = "thread"
+    timeout = 10
+
     @property
     def name(self) -> str:
         return "open_browser"
@@ -6,6 +6,8 @@ from .base_tool import BaseTool
 SCRATCH_PAD_DIR = os.getenv("SCRATCH_PAD_DIR", "./scratchpad")
 
 class CreateFileTool(BaseTool):
+    execution_mode = "thread"
+
     @property
     def name(self) -> str:
         return "create_file"
@@ -44,6 +46,8 @@ class CreateFileTool(BaseTool):
         return {"status": "success", "message": f"File '{file_name}' created successfully"}
 
 class UpdateFileTool(BaseTool):
+    execution_mode = "thread"
+
     @property
     def name(self) -> str:
         return "update_file"
@@ -91,6 +95,8 @@ class UpdateFileTool(BaseTool):
         return {"status": "success", "message": f"File '{file_name}' updated successfully"}
 
 class DeleteFileTool(BaseTool):
+    execution_mode = "thread"
+
     @property
     def name(self) -> str:
         return "delete_file"
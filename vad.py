@@ -0,0 +1,106 @@
+import os
+import sys
+import wave
+import logging
+import collections
+from abc import ABC, abstractmethod
+import numpy as np
+from audio_format import RATE, BYTES_PER_FRAME
+
+# Client-side voice activity detection ahead of upload (server_vad still decides turns)
+LOCAL_VAD = os.getenv("LOCAL_VAD", "0") == "1"
+LOCAL_VAD_THRESHOLD_DBFS = float(os.getenv("LOCAL_VAD_THRESHOLD_DBFS", "-45"))
+LOCAL_VAD_PREROLL_MS = int(os.getenv("LOCAL_VAD_PREROLL_MS", "300"))
+# Must exceed the server's silence_duration_ms, or server_vad never sees the speech end
+LOCAL_VAD_HANGOVER_MS = int(os.getenv("LOCAL_VAD_HANGOVER_MS", "600"))
+VAD_FRAME_MS = 20
+
+class BaseVAD(ABC):
+    @abstractmethod
+    def is_speech(self, frame) -> bool:
+        """Classify one VAD_FRAME_MS frame of 16-bit mono PCM."""
+        pass
+
+class EnergyVAD(BaseVAD):
+    """Flags frames that are loud enough and not dominated by hiss-like zero crossings."""
+
+    def __init__(self, threshold_dbfs=LOCAL_VAD_THRESHOLD_DBFS, max_zero_crossing_rate=0.35):
+        self.threshold_dbfs = threshold_dbfs
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+
+    def is_speech(self, frame) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if not samples.size:
+            return False
+        rms = np.sqrt(np.mean(samples * samples))
+        dbfs = 20 * np.log10(rms / 32768 + 1e-10)
+        zero_crossing_rate = np.count_nonzero(np.diff(np.signbit(samples))) / samples.size
+        return bool(dbfs > self.threshold_dbfs and zero_crossing_rate < self.max_zero_crossing_rate)
+
+class VADGate:
+    """Drops silent frames before upload, keeping a pre-roll ahead of speech and a hangover after it."""
+
+    def __init__(self, vad=None, preroll_ms=LOCAL_VAD_PREROLL_MS, hangover_ms=LOCAL_VAD_HANGOVER_MS):
+        self.vad = vad or EnergyVAD()
+        self.frame_bytes = RATE * VAD_FRAME_MS // 1000 * BYTES_PER_FRAME
+        self.preroll = collections.deque(maxlen=preroll_ms // VAD_FRAME_MS)
+        self.hangover_frames = hangover_ms // VAD_FRAME_MS
+        self.hangover = 0
+        self.remainder = bytearray()
+        self.frames_in = 0
+        self.frames_sent = 0
+
+    @property
+    def in_speech(self):
+        return self.hangover > 0
+
+    def process(self, audio):
+        """Returns the audio worth uploading from this chunk, or None if it was all silence."""
+        self.remainder += audio
+        out = bytearray()
+        usable = len(self.remainder) - len(self.remainder) % self.frame_bytes
+        for offset in range(0, usable, self.frame_bytes):
+            frame = bytes(self.remainder[offset:offset + self.frame_bytes])
+            self.frames_in += 1
+            if self.vad.is_speech(frame):
+                if not self.in_speech and self.preroll:
+                    self.frames_sent += len(self.preroll)
+                    for held in self.preroll:
+                        out += held
+                    self.preroll.clear()
+                self.hangover = self.hangover_frames
+            elif self.in_speech:
+                self.hangover -= 1
+            else:
+                self.preroll.append(frame)
+                continue
+            out += frame
+            self.frames_sent += 1
+        del self.remainder[:usable]
+        return bytes(out) if out else None
+
+    def reset(self):
+        self.preroll.clear()
+        self.remainder.clear()
+        self.hangover = 0
+
+def gate_wav(path, gate=None):
+    """Run a 16-bit mono WAV at RATE through a VADGate, for offline checks against fixtures."""
+    gate = gate or VADGate()
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1 or wav.getframerate() != RATE:
+            raise ValueError(f"{path} must be 16-bit mono PCM at {RATE} Hz")
+        kept = bytearray()
+        while True:
+            chunk = wav.readframes(1024)
+            if not chunk:
+                break
+            kept += gate.process(chunk) or b""
+    return bytes(kept), gate
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for wav_path in sys.argv[1:]:
+        kept, gate = gate_wav(wav_path)
+        ratio = gate.frames_sent / gate.frames_in if gate.frames_in else 0
+        logging.info(f"{wav_path}: kept {gate.frames_sent}/{gate.frames_in} frames ({ratio:.0%}), {len(kept)} bytes")
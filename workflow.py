@@ -2,11 +2,14 @@ import asyncio
 import logging
 import json
 import time
-import base64
-from openai_client import OpenAIRealtimeClient
-from agent_tools import function_map, tools
+from openai_client import OpenAIRealtimeClient, RECONNECTED_EVENT
+from agent_tools import function_map, tools, registry
+from incremental_json import IncrementalJSONObject
+from utils import log_runtime
 
-from audio_handler import AsyncMicrophone, play_audio
+from vad import LOCAL_VAD, VADGate
+from barge_in import BargeInController
+from event_router import EventRouter
 from dotenv import load_dotenv
 import os
 
@@ -36,109 +39,283 @@ human_name = personalization.get("human_name", "User")
 # Define session instructions constant
 SESSION_INSTRUCTIONS = f"You are {ai_assistant_name}, a helpful assistant. Respond concisely to {human_name}."
 
-async def process_ws_messages(client, mic):
-    assistant_reply = ""
-    audio_chunks = []
-    response_in_progress = False
-    function_call = None
-    function_call_args = ""
-
-    while True:
-        try:
-            event = await client.receive_event()
-
-            if event["type"] == "response.created":
-                mic.start_receiving()
-                response_in_progress = True
-            elif event["type"] == "response.output_item.added":
-                item = event.get("item", {})
-                if item.get("type") == "function_call":
-                    function_call = item
-                    function_call_args = ""
-            elif event["type"] == "response.function_call_arguments.delta":
-                delta = event.get("delta", "")
-                function_call_args += delta
-            elif event["type"] == "response.function_call_arguments.done":
-                if function_call:
-                    function_name = function_call.get("name")
-                    call_id = function_call.get("call_id")
-                    try:
-                        args = json.loads(function_call_args) if function_call_args else {}
-                    except json.JSONDecodeError:
-                        logging.error(f"Failed to parse function arguments: {function_call_args}")
-                        args = {}
-                    if function_name in function_map:
-                        logging.info(f"🛠️ Calling function: {function_name} with args: {args}")
-                        try:
-                            result = await function_map[function_name](function_name, **args)
-                            logging.info(f"🛠️ Function call result: {result}")
-                        except Exception as e:
-                            logging.error(f"Error executing function {function_name}: {str(e)}")
-                            result = {"error": f"Error executing function '{function_name}': {str(e)}"}
-                    else:
-                        logging.error(f"Function '{function_name}' not found in function_map")
-                        result = {"error": f"Function '{function_name}' not found."}
-                    function_call_output = {
-                        "type": "conversation.item.create",
-                        "item": {
-                            "type": "function_call_output",
-                            "call_id": call_id,
-                            "output": json.dumps(result),
-                        },
-                    }
-                    await client.send_event(function_call_output)
-                    await client.send_event({"type": "response.create"})
-                    function_call = None
-                    function_call_args = ""
-            elif event["type"] == "response.text.delta":
-                assistant_reply += event.get("delta", "")
-                print(f"{ai_assistant_name}: {event.get('delta', '')}", end="", flush=True)
-            elif event["type"] == "response.audio.delta":
-                audio_chunks.append(base64.b64decode(event["delta"]))
-            elif event["type"] == "response.done":
-                logging.info(f"{ai_assistant_name}'s response complete.")
-                if audio_chunks:
-                    audio_data = b"".join(audio_chunks)
-                    logging.info(f"Playing {len(audio_data)} bytes of audio data")
-                    await play_audio(audio_data)
-                assistant_reply = ""
-                audio_chunks = []
-                response_in_progress = False
-                mic.stop_receiving()
-                mic.start_recording()
-                logging.info("Resumed recording after response")
-            elif event["type"] == "input_audio_buffer.speech_started":
-                logging.info(f"Speech detected, {ai_assistant_name} is listening...")
-            elif event["type"] == "input_audio_buffer.speech_stopped":
-                mic.stop_recording()
-                logging.info("Speech ended, processing...")
-                await client.send_event({"type": "input_audio_buffer.commit"})
-
-        except Exception as e:
-            logging.exception(f"Error processing WebSocket message: {e}")
-            if 'audio_chunks' in locals() and audio_chunks:
-                logging.warning(f"Discarding {len(audio_chunks)} incomplete audio chunks due to error")
-                audio_chunks = []
-            break
+def parse_function_arguments(arguments):
+    try:
+        return json.loads(arguments) if arguments else {}
+    except json.JSONDecodeError:
+        logging.error(f"Failed to parse function arguments: {arguments}")
+        return {}
+
+class ConversationHandlers:
+    """Conversation state plus one handler per realtime event type, wired into an EventRouter."""
+
+    def __init__(self, client, mic, player, barge_in):
+        self.client = client
+        self.mic = mic
+        self.player = player
+        self.barge_in = barge_in
+        self.assistant_reply = ""
+        self.response_in_progress = False
+        # Bumped on every response.created, so a tool flush can tell whether the user started a new one
+        self.response_generation = 0
+        # Function calls of the current response by call_id; each starts running once its arguments are done
+        self.function_calls = {}
+        self.function_call_tasks = {}
+        # Outputs being collected off the receive loop, and whether one still owes the model a response.create
+        self.function_call_flushes = set()
+        self.follow_up_pending = False
+        # Full duplex plays out the end of a reply in the background; the next reply cancels it
+        self.finish_task = None
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.speculation_saved_ms = 0.0
+
+    def register(self, router):
+        router.add_handler("response.created", self.on_response_created)
+        router.add_handler("response.output_item.added", self.on_output_item_added)
+        router.add_handler("response.function_call_arguments.delta", self.on_function_call_arguments_delta)
+        router.add_handler("response.function_call_arguments.done", self.on_function_call_arguments_done)
+        router.add_handler("response.text.delta", self.on_text_delta)
+        router.add_handler("response.audio.delta", self.on_audio_delta)
+        router.add_handler("response.done", self.on_response_done)
+        router.add_handler("input_audio_buffer.speech_started", self.on_speech_started)
+        router.add_handler("input_audio_buffer.speech_stopped", self.on_speech_stopped)
+        router.add_handler(RECONNECTED_EVENT, self.on_reconnected)
+
+    def cancel_finish(self):
+        # finish() ends by flushing the player, which would drop the new reply's audio
+        if self.finish_task:
+            self.finish_task.cancel()
+            self.finish_task = None
+
+    def on_finish_done(self, task):
+        if task is self.finish_task:
+            self.finish_task = None
+        if not task.cancelled() and task.exception():
+            logging.error(f"Error finishing playback: {task.exception()!r}")
+
+    async def on_response_created(self, event):
+        self.cancel_finish()
+        self.mic.start_receiving()
+        self.barge_in.on_response_created()
+        self.response_in_progress = True
+        self.response_generation += 1
+
+    async def on_output_item_added(self, event):
+        item = event.get("item", {})
+        if item.get("type") == "function_call":
+            name = item.get("name")
+            call = {"name": name, "arguments": "", "parser": None, "speculation": None}
+            tool = registry.get(name) if name in registry else None
+            if tool and tool.speculative and tool.execution_mode != "thread":
+                # Parse the arguments as they stream so the call can start before they are done
+                call["parser"] = IncrementalJSONObject()
+                call["required"] = tool.parameters.get("required", [])
+            self.function_calls[item.get("call_id")] = call
+
+    async def on_function_call_arguments_delta(self, event):
+        call = self.function_calls.get(event.get("call_id"))
+        if not call:
+            return
+        call["arguments"] += event.get("delta", "")
+        parser = call["parser"]
+        if parser:
+            parser.feed(event.get("delta", ""))
+            speculation = call["speculation"]
+            if speculation and speculation["args"] != parser.members:
+                # A later member changed the arguments, the running call is for the wrong ones
+                self.cancel_speculation(call)
+                speculation = None
+            if not speculation and not parser.failed and parser.has(call["required"]):
+                self.start_speculation(call, dict(parser.members))
+
+    def start_speculation(self, call, args):
+        logging.info(f"⚡ Speculatively calling {call['name']} with args: {args}")
+        speculation = {"args": args, "started_at": time.perf_counter(), "finished_at": None}
+        speculation["task"] = asyncio.create_task(self.run_function_call(call["name"], args))
+        speculation["task"].add_done_callback(lambda task: speculation.update(finished_at=time.perf_counter()))
+        call["speculation"] = speculation
+
+    def cancel_speculation(self, call):
+        call["speculation"]["task"].cancel()
+        call["speculation"] = None
+        self.speculation_misses += 1
+
+    async def on_function_call_arguments_done(self, event):
+        call_id = event.get("call_id")
+        call = self.function_calls.get(call_id)
+        if not call:
+            return
+        args = parse_function_arguments(event.get("arguments") or call["arguments"])
+        speculation = call["speculation"]
+        if speculation and speculation["args"] == args:
+            saved = (speculation["finished_at"] or time.perf_counter()) - speculation["started_at"]
+            self.speculation_hits += 1
+            self.speculation_saved_ms += saved * 1000
+            log_runtime("speculative_tool_saved", saved)
+            self.function_call_tasks[call_id] = speculation["task"]
+            return
+        if speculation:
+            self.cancel_speculation(call)
+        self.function_call_tasks[call_id] = asyncio.create_task(self.run_function_call(call["name"], args))
+
+    async def run_function_call(self, function_name, args):
+        if function_name in function_map:
+            logging.info(f"🛠️ Calling function: {function_name} with args: {args}")
+            try:
+                result = await function_map[function_name](function_name, **args)
+                logging.info(f"🛠️ Function call result: {result}")
+            except Exception as e:
+                logging.error(f"Error executing function {function_name}: {str(e)}")
+                result = {"error": f"Error executing function '{function_name}': {str(e)}"}
+        else:
+            logging.error(f"Function '{function_name}' not found in function_map")
+            result = {"error": f"Function '{function_name}' not found."}
+        return result
+
+    async def send_function_call_outputs(self, generation=None):
+        """Waits for every call of the response, then returns all outputs and asks for one follow-up."""
+        generation = self.response_generation if generation is None else generation
+        tasks, self.function_call_tasks = self.function_call_tasks, {}
+        self.function_calls = {}
+        results = await asyncio.gather(*tasks.values())
+        for call_id, result in zip(tasks, results):
+            await self.client.send_event({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "function_call_output",
+                    "call_id": call_id,
+                    "output": json.dumps(result),
+                },
+            })
+        if self.response_generation != generation and self.response_in_progress:
+            # The user spoke while the tools ran; ask again once that response is done
+            self.follow_up_pending = True
+        else:
+            await self.client.send_event({"type": "response.create"})
+
+    def cancel_function_calls(self):
+        for task in self.function_call_tasks.values():
+            task.cancel()
+        for call in self.function_calls.values():
+            if call["speculation"]:
+                call["speculation"]["task"].cancel()
+        self.function_call_tasks = {}
+        self.function_calls = {}
+
+    async def on_text_delta(self, event):
+        self.assistant_reply += event.get("delta", "")
+        print(f"{ai_assistant_name}: {event.get('delta', '')}", end="", flush=True)
+
+    async def on_audio_delta(self, event):
+        if self.barge_in.on_audio_delta(event.get("item_id")):
+            self.cancel_finish()
+            self.player.enqueue(await self.client.decode_audio(event))
+
+    async def on_response_done(self, event):
+        logging.info(f"{ai_assistant_name}'s response complete.")
+        self.barge_in.on_response_done()
+        if event.get("response", {}).get("status") == "cancelled":
+            self.cancel_function_calls()
+            self.follow_up_pending = False
+        elif self.function_call_tasks:
+            # Slow tools must not hold up the receive loop, so their outputs are sent from a task
+            flush = asyncio.create_task(self.send_function_call_outputs(self.response_generation))
+            self.function_call_flushes.add(flush)
+            flush.add_done_callback(self.function_call_flushes.discard)
+        elif self.follow_up_pending:
+            self.follow_up_pending = False
+            await self.client.send_event({"type": "response.create"})
+        # The response is over for the server before its audio has finished playing here
+        self.assistant_reply = ""
+        self.response_in_progress = False
+        self.mic.stop_receiving()
+        if self.mic.full_duplex:
+            # Keep reading events while the reply plays out so it can still be interrupted
+            self.finish_task = asyncio.create_task(self.player.finish())
+            self.finish_task.add_done_callback(self.on_finish_done)
+        else:
+            await self.player.finish()
+        self.mic.start_recording()
+        logging.info("Resumed recording after response")
+
+    async def on_speech_started(self, event):
+        logging.info(f"Speech detected, {ai_assistant_name} is listening...")
+        if self.mic.full_duplex:
+            await self.barge_in.interrupt("server")
+
+    async def on_speech_stopped(self, event):
+        if not self.mic.full_duplex:
+            self.mic.stop_recording()
+        logging.info("Speech ended, processing...")
+        await self.client.send_event({"type": "input_audio_buffer.commit"})
+
+    async def on_reconnected(self, event):
+        # Whatever response was streaming died with the old connection
+        logging.info(f"Reconnected in {event['reconnect_latency'] * 1000:.0f}ms, resetting turn state")
+        self.cancel_finish()
+        self.player.reset()
+        self.barge_in.on_response_done()
+        self.cancel_function_calls()
+        for flush in self.function_call_flushes:
+            flush.cancel()
+        self.follow_up_pending = False
+        self.assistant_reply = ""
+        self.response_in_progress = False
+        self.mic.stop_receiving()
+        self.mic.start_recording()
+
+async def process_ws_messages(client, mic, player, barge_in, router=None):
+    # Callers may pass a router that already has middleware installed, e.g. to timestamp events
+    router = router or EventRouter()
+    ConversationHandlers(client, mic, player, barge_in).register(router)
+
+    try:
+        while True:
+            try:
+                event = await client.receive_event()
+                await router.dispatch(event)
+
+            except Exception as e:
+                logging.exception(f"Error processing WebSocket message: {e}")
+                if player.queued_bytes:
+                    logging.warning(f"Discarding {player.queued_bytes} bytes of queued audio due to error")
+                player.reset()
+                break
+    finally:
+        router.log_stats()
+
+async def stream_microphone(client, mic, vad_gate, barge_in):
+    # The mic only yields audio while recording, one upload-sized batch at a time
+    async for audio_data in mic:
+        if vad_gate:
+            was_speaking = vad_gate.in_speech
+            audio_data = vad_gate.process(audio_data)
+            if mic.full_duplex and vad_gate.in_speech and not was_speaking:
+                await barge_in.interrupt("local")
+            if not audio_data:
+                continue
+        await client.send_audio(audio_data)
 
 async def run_conversation():
+    # Imported here so the headless server and benchmarks can use this module without PortAudio
+    from audio_handler import AsyncMicrophone, AudioPlayer
+
     client = OpenAIRealtimeClient(SESSION_INSTRUCTIONS, tools)
     mic = AsyncMicrophone()
+    player = AudioPlayer()
+    vad_gate = VADGate() if LOCAL_VAD else None
+    barge_in = BargeInController(client, player)
 
     try:
         await client.connect()
-        process_task = asyncio.create_task(process_ws_messages(client, mic))
+        process_task = asyncio.create_task(process_ws_messages(client, mic, player, barge_in))
 
         logging.info(f"Conversation started. Speak freely, and {ai_assistant_name} will respond.")
         mic.start_recording()
         logging.info("Recording started. Listening for speech...")
 
-        while True:
-            if mic.is_recording and not mic.is_receiving:
-                audio_data = mic.get_audio_data()
-                if audio_data and len(audio_data) > 0:
-                    await client.send_audio(audio_data)
-            await asyncio.sleep(0.1)  # Small delay to prevent busy-waiting
+        await stream_microphone(client, mic, vad_gate, barge_in)
 
     except KeyboardInterrupt:
         logging.info("Keyboard interrupt received. Closing the connection.")
@@ -147,7 +324,10 @@ async def run_conversation():
     finally:
         mic.stop_recording()
         mic.close()
+        player.close()
+        logging.info(f"📊 Session: {client.metrics()}")
         await client.close()
+        registry.shutdown()
         if 'process_task' in locals():
             process_task.cancel()
             try: